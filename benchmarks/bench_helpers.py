@@ -0,0 +1,196 @@
+"""
+Microbenchmarks of the extraction helpers with a stored baseline.
+
+Every case reports time and peak memory per call and a digest of its
+result. The run fails when a result differs from the baseline or a case
+got slower / hungrier than the allowed tolerance.
+
+Run from the project root:
+    python -m benchmarks.bench_helpers                 # compare with baseline.json
+    python -m benchmarks.bench_helpers --update        # store a new baseline
+
+Timings depend on the machine: refresh the baseline on the machine that
+runs the comparison.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+from benchmarks.payloads import composer_payloads, product_pages
+from driver_manager.selenium_manager import SeleniumManager
+from parser.ozon_parser import OzonWorker
+from utils.helpers import (
+    extract_price_from_html,
+    extract_price_from_string,
+    find_product_title,
+    find_seller_name,
+    find_web_price_property,
+    parse_price_data
+)
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Так Chrome показывает JSON-ответ API
+PRE_WRAPPER = '<html><head></head><body><pre style="word-wrap: break-word; white-space: pre-wrap;">{}</pre></body></html>'
+
+PRICE_STRINGS = ["55 325 ₽", "61 472 ₽", "1 299 ₽", "127 144 ₽", "999 ₽", "", "нет в наличии"]
+
+
+def build_cases() -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    (name, zero-argument call) for every helper and corpus item
+    """
+    manager = SeleniumManager()
+    cases = [
+        ("extract_price_from_string", lambda: [extract_price_from_string(value) for value in PRICE_STRINGS])
+    ]
+
+    for name, payload in composer_payloads(3):
+        widget_states = json.loads(payload)["widgetStates"]
+        web_price = find_web_price_property(widget_states)
+        wrapped = PRE_WRAPPER.format(payload)
+        cases += [
+            (f"extract_json_from_html[{name}]", lambda wrapped=wrapped: manager.extract_json_from_html(wrapped)),
+            (f"find_web_price_property[{name}]", lambda states=widget_states: find_web_price_property(states)),
+            (f"find_product_title[{name}]", lambda states=widget_states: find_product_title(states)),
+            (f"find_seller_name[{name}]", lambda states=widget_states: find_seller_name(states)),
+            (f"parse_price_data[{name}]", lambda value=web_price: parse_price_data(value)),
+            (f"extract_price_info[{name}]", lambda payload=payload: OzonWorker.extract_price_info(payload, 0))
+        ]
+
+    for name, page in product_pages(3):
+        cases.append((f"extract_price_from_html[{name}]", lambda page=page: extract_price_from_html(page)))
+
+    return cases
+
+
+def digest(result: Any) -> str:
+    return hashlib.sha1(repr(result).encode("utf-8")).hexdigest()[:16]
+
+
+def time_per_call(func: Callable[[], Any], repeat: int = 7, min_time: float = 0.1) -> float:
+    """
+    Best of several repeats, each long enough to be measured reliably.
+    CPU time with GC disabled (like timeit), so other processes add less noise
+    """
+    def run(loops: int) -> float:
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time.process_time()
+            for _ in range(loops):
+                func()
+            return time.process_time() - start
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    loops = 1
+    while True:
+        elapsed = run(loops)
+        if elapsed >= min_time:
+            break
+        loops *= 2
+
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        best = min(best, run(loops) / loops)
+    return best
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """
+    Peak bytes allocated during one call
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(peak - before, 0)
+
+
+def measure(cases: List[Tuple[str, Callable[[], Any]]]) -> Dict[str, dict]:
+    measurements = {}
+    for name, func in cases:
+        result = func()
+        measurements[name] = {
+            "time_us": round(time_per_call(func) * 1e6, 2),
+            "peak_kb": round(peak_memory(func) / 1024, 1),
+            "result": digest(result)
+        }
+    return measurements
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Print the comparison table, returns the list of regressions
+    """
+    regressions = []
+    print(f"{'case':<52}{'us/call':>12}{'baseline':>12}{'change':>9}{'peak KB':>10}  status")
+
+    for name, entry in current.items():
+        base = baseline.get(name)
+        status = "new"
+        change = ""
+        if base:
+            ratio = entry["time_us"] / base["time_us"] if base["time_us"] else 1.0
+            change = f"{(ratio - 1) * 100:+.0f}%"
+            status = "ok"
+            if entry["result"] != base["result"]:
+                status = "RESULT CHANGED"
+            elif ratio > 1 + tolerance:
+                status = "SLOWER"
+            elif base["peak_kb"] and entry["peak_kb"] > base["peak_kb"] * (1 + tolerance) + 1:
+                status = "MORE MEMORY"
+            if status != "ok":
+                regressions.append(f"{name}: {status}")
+
+        base_time = f"{base['time_us']:.1f}" if base else "-"
+        print(f"{name:<52}{entry['time_us']:>12.1f}{base_time:>12}{change:>9}{entry['peak_kb']:>10.1f}  {status}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraction helper microbenchmarks")
+    parser.add_argument("--update", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown / memory growth (0.5 = +50%%)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    current = measure(build_cases())
+
+    if args.update:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline with {len(current)} cases written to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = compare(current, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
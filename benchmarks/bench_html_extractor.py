@@ -0,0 +1,68 @@
+"""
+Compare the HTML price extraction before and after the single-pass extractor.
+
+Run from the project root:
+    python -m benchmarks.bench_html_extractor
+"""
+import logging
+import re
+import time
+from benchmarks.payloads import make_adversarial_html, make_product_html, product_pages
+from utils.helpers import extract_price_from_html, extract_price_from_string
+
+
+def legacy_extract(html_content: str):
+    """
+    The previous extraction: three uncompiled regexes over the whole page
+    """
+    price_match = re.search(r'<span class="[^"]*?\s*tsBody[^"]*?"[^>]*?>\s*([0-9\s]+)\s*₽\s*</span>', html_content)
+    old_price_match = re.search(r'<span class="[^"]*?\s*tsBodyControl[^"]*?"[^>]*?>\s*([0-9\s]+)\s*₽\s*</span>', html_content)
+    card_price_match = re.search(r'с Ozon Картой[^<]*?<span[^>]*?>\s*([0-9\s]+)\s*₽\s*</span>', html_content, re.DOTALL)
+
+    price = extract_price_from_string(price_match.group(1)) if price_match else None
+    original_price = extract_price_from_string(old_price_match.group(1)) if old_price_match else price
+    card_price = extract_price_from_string(card_price_match.group(1)) if card_price_match else price
+    return (card_price, price, original_price) if price else None
+
+
+def single_pass_extract(html_content: str):
+    price_info = extract_price_from_html(html_content)
+    if price_info is None:
+        return None
+    return price_info.cardPrice, price_info.price, price_info.originalPrice
+
+
+def measure(func, payload: str, repeat: int) -> float:
+    func(payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    return (time.perf_counter() - start) / repeat
+
+
+def fixtures():
+    pages = list(product_pages())
+    pages.append(("synthetic-large.html", make_product_html(2000, size=8_000_000)))
+    # Цена в самом конце - извлечение вынуждено пройти всю страницу
+    pages.append(("adversarial-100k.html", make_adversarial_html(100_000) + make_product_html(3000, size=0)))
+    pages.append(("adversarial-1m.html", make_adversarial_html(1_000_000) + make_product_html(3000, size=0)))
+    return pages
+
+
+def main(repeat: int = 5):
+    logging.disable(logging.CRITICAL)
+    print(f"{'page':<28}{'size KB':>10}{'legacy ms':>12}{'single ms':>12}{'speedup':>10}")
+
+    for name, page in fixtures():
+        expected = legacy_extract(page)
+        actual = single_pass_extract(page)
+        if actual != expected:
+            raise AssertionError(f"{name}: single-pass result {actual} differs from legacy {expected}")
+
+        legacy = measure(legacy_extract, page, repeat)
+        single = measure(single_pass_extract, page, repeat)
+        print(f"{name:<28}{len(page) / 1024:>10.0f}{legacy * 1000:>12.2f}{single * 1000:>12.2f}{legacy / single:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+End-to-end throughput of OzonParser and the HTTP API against the fake Ozon server.
+
+Run from the project root:
+    python -m benchmarks.bench_throughput --workers 1,2,4,8 --articles 200
+    python -m benchmarks.bench_throughput --mode api --concurrency 8 --batch 10
+
+Without --browser only the direct HTTP path is exercised: Chrome is not
+launched and articles answered with a challenge page count as failures.
+
+With --browser the peak RSS of all Chrome process trees is sampled, so
+one browser per worker can be compared with tabs in a shared browser:
+    python -m benchmarks.bench_throughput --browser --no-http --workers 4,8 --tabs 1
+    python -m benchmarks.bench_throughput --browser --no-http --workers 4,8 --tabs 4
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from typing import List
+import aiohttp
+from benchmarks.fake_ozon import FakeOzonServer, add_server_arguments, server_from_args
+from driver_manager.memory_watchdog import driver_processes, psutil, tree_rss
+from config.settings import settings
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile, q in [0, 100]
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class MemorySampler:
+    """
+    Peak RSS of all Chrome process trees of a parser during a run
+    """
+
+    def __init__(self, get_parser, interval: float = 0.5):
+        self.get_parser = get_parser
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        return False
+
+    def sample(self) -> int:
+        parser = self.get_parser()
+        if parser is None:
+            return 0
+        # Вкладки одного Chrome делят процесс - считаем каждый браузер один раз
+        pids = {manager.service_pid for manager in parser.pool.managers()}
+        return sum(tree_rss(driver_processes(pid)) for pid in pids)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, self.sample())
+
+
+def configure(args: argparse.Namespace, server: FakeOzonServer, workers: int):
+    """
+    Point the parser at the fake server and size it for one run
+    """
+    settings.OZON_BASE_URL = server.base_url
+    settings.OZON_API_URL = server.api_url
+    settings.MAX_WORKERS = workers
+    settings.DRIVER_POOL_MAX_SIZE = workers
+    settings.HTTP_CONNECTIONS_PER_HOST = max(settings.HTTP_CONNECTIONS_PER_HOST, workers)
+    settings.CACHE_ENABLED = False
+    # Измеряем парсер, а не паузы: лимит фиксированный и высокий
+    settings.RATE_INITIAL = settings.RATE_MIN = settings.RATE_MAX = args.rate
+    settings.RATE_BURST = args.rate
+    settings.PACING_SETTLE_DELAY = args.settle_delay
+    settings.DRIVER_TABS_PER_BROWSER = args.tabs
+    settings.HTTP_FETCH_ENABLED = not args.no_http
+
+    if not args.browser:
+        settings.DRIVER_POOL_MIN_SIZE = 0
+        settings.DRIVER_ACQUIRE_TIMEOUT = 0
+        settings.SESSION_CHECK_INTERVAL = 10 ** 6
+
+
+def make_parser(args: argparse.Namespace):
+    from parser.ozon_parser import OzonParser
+
+    parser = OzonParser()
+    if not args.browser:
+        # Планировщик уже рассчитан на workers; пул без драйверов сразу отказывает
+        parser.pool.max_size = 0
+    parser.initialize()
+    return parser
+
+
+def report(label: str, latencies: List[float], elapsed: float, items: int, failed: int, peak_rss: int = 0):
+    line = (
+        f"{label:<12}{items:>8}{failed:>8}{items / elapsed:>12.1f}"
+        f"{percentile(latencies, 50) * 1000:>10.0f}{percentile(latencies, 95) * 1000:>10.0f}"
+        f"{percentile(latencies, 99) * 1000:>10.0f}"
+    )
+    if peak_rss:
+        gigabytes = peak_rss / 1024 ** 3
+        line += f"{peak_rss / 1024 ** 2:>10.0f}{items / elapsed / gigabytes:>12.1f}"
+    print(line)
+
+
+def run_parser(args: argparse.Namespace, server: FakeOzonServer, workers: int, first_article: int):
+    """
+    Drive OzonParser directly, latency is measured per article
+    """
+    configure(args, server, workers)
+    parser = make_parser(args)
+    try:
+        articles = list(range(first_article, first_article + args.articles))
+        latencies = []
+        lock = threading.Lock()
+
+        with MemorySampler(lambda: parser if args.browser else None) as sampler:
+            start = time.perf_counter()
+            futures = parser.submit_articles(articles, no_cache=True)
+
+            def done(future):
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+            for future in futures:
+                future.add_done_callback(done)
+            results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+    finally:
+        parser.close()
+
+    failed = sum(1 for result in results if not result.success)
+    report(f"{workers} workers", latencies, elapsed, len(results), failed, sampler.peak)
+
+
+def run_api(args: argparse.Namespace, server: FakeOzonServer, workers: int, first_article: int):
+    """
+    Drive POST /api/v1/get_price with concurrent clients, latency is measured per request
+    """
+    import routes.parser_routes as parser_routes
+
+    configure(args, server, workers)
+    # Новый парсер с настройками этого прогона
+    with parser_routes.parser_lock:
+        old_parser = parser_routes.parser_instance
+        parser_routes.parser_instance = make_parser(args)
+    if old_parser:
+        old_parser.close()
+
+    url = f"http://127.0.0.1:{args.api_port}/api/v1/get_price"
+    batches = [
+        list(range(first_article + i, min(first_article + i + args.batch, first_article + args.articles)))
+        for i in range(0, args.articles, args.batch)
+    ]
+
+    async def drive():
+        latencies = []
+        failed = 0
+        queue = asyncio.Queue()
+        for batch in batches:
+            queue.put_nowait(batch)
+
+        async def client(session: aiohttp.ClientSession):
+            nonlocal failed
+            while not queue.empty():
+                batch = queue.get_nowait()
+                started = time.perf_counter()
+                async with session.post(url, json={"articles": batch, "no_cache": True}) as response:
+                    body = await response.json()
+                latencies.append(time.perf_counter() - started)
+                failed += sum(1 for result in body.get("results", []) if not result["success"])
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+            await asyncio.gather(*(client(session) for _ in range(args.concurrency)))
+        return latencies, failed
+
+    with MemorySampler(lambda: parser_routes.parser_instance if args.browser else None) as sampler:
+        start = time.perf_counter()
+        latencies, failed = asyncio.run(drive())
+        elapsed = time.perf_counter() - start
+    report(f"{workers} workers", latencies, elapsed, args.articles, failed, sampler.peak)
+
+
+def start_api(port: int):
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="benchmark-api", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser throughput against the fake Ozon server")
+    add_server_arguments(parser)
+    parser.add_argument("--mode", choices=["parser", "api"], default="parser")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma separated worker counts")
+    parser.add_argument("--articles", type=int, default=200, help="articles per run")
+    parser.add_argument("--batch", type=int, default=10, help="articles per API request (api mode)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent API clients (api mode)")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=1000.0, help="fixed request rate limit, per second")
+    parser.add_argument("--settle-delay", type=float, default=settings.PACING_SETTLE_DELAY)
+    parser.add_argument("--browser", action="store_true", help="allow falling back to Chrome")
+    parser.add_argument("--no-http", action="store_true", help="skip the direct HTTP path, every article goes through Chrome")
+    parser.add_argument("--tabs", type=int, default=1, help="pool slots per Chrome process (DRIVER_TABS_PER_BROWSER)")
+    args = parser.parse_args()
+
+    # Ошибки отдельных артикулов попадают в колонку failed, а не в лог
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger("benchmarks").setLevel(logging.INFO)
+
+    server = server_from_args(args)
+    server.start()
+    api_server = start_api(args.api_port) if args.mode == "api" else None
+
+    print(f"mode={args.mode} latency={args.latency}s error_rate={args.error_rate} challenge_rate={args.challenge_rate}")
+    header = f"{'run':<12}{'items':>8}{'failed':>8}{'articles/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if args.browser and psutil is not None:
+        header += f"{'peak MB':>10}{'art/s/GB':>12}"
+    print(header)
+
+    try:
+        first_article = 100000
+        for workers in [int(value) for value in args.workers.split(",")]:
+            if args.mode == "api":
+                run_api(args, server, workers, first_article)
+            else:
+                run_parser(args, server, workers, first_article)
+            # Новые артикулы на каждый прогон, чтобы не было совпадений
+            first_article += args.articles
+    finally:
+        if api_server:
+            import routes.parser_routes as parser_routes
+            api_server.should_exit = True
+            if parser_routes.parser_instance:
+                parser_routes.parser_instance.close()
+        server.stop()
+
+    print(f"server: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare the widgetStates extraction path before and after WidgetIndex.
+
+Run from the project root:
+    python -m benchmarks.bench_widget_index
+"""
+import json
+import logging
+import time
+from benchmarks.payloads import composer_payloads
+from parser.ozon_parser import OzonWorker
+from utils.json_backend import JSON_BACKEND
+
+
+def legacy_extract(json_content: str):
+    """
+    The previous extraction: validation decode, second full decode and
+    one scan over widgetStates per field
+    """
+    json.loads(json_content)
+    data = json.loads(json_content)
+    widget_states = data.get('widgetStates', {})
+
+    web_price = next((v for k, v in widget_states.items() if k.startswith('webPrice-') and isinstance(v, str)), None)
+    price = json.loads(web_price)
+
+    title = None
+    for key, value in widget_states.items():
+        if key.startswith('webProductHeading-') and isinstance(value, str):
+            title = json.loads(value).get('title')
+            break
+
+    seller = None
+    for key, value in widget_states.items():
+        if key.startswith('webStickyProducts-') and isinstance(value, str):
+            sticky = json.loads(value.replace('&quot;', '"'))
+            if 'seller' in sticky and 'name' in sticky['seller']:
+                seller = sticky['seller']['name']
+                break
+
+    return price, title, seller
+
+
+def indexed_extract(json_content: str):
+    return OzonWorker.extract_price_info(json_content, 0)
+
+
+def measure(func, payload: str, repeat: int) -> float:
+    func(payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(repeat: int = 20):
+    logging.disable(logging.CRITICAL)
+    print(f"JSON backend: {JSON_BACKEND}")
+    print(f"{'payload':<28}{'size KB':>10}{'legacy ms':>12}{'indexed ms':>12}{'speedup':>10}")
+
+    for name, payload in composer_payloads():
+        legacy = measure(legacy_extract, payload, repeat)
+        indexed = measure(indexed_extract, payload, repeat)
+        print(f"{name:<28}{len(payload) / 1024:>10.0f}{legacy * 1000:>12.2f}{indexed * 1000:>12.2f}{legacy / indexed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Local stand-in for ozon.ru serving product pages and composer-api JSON.
+
+Payloads come from benchmarks/payloads.py (recorded files in
+benchmarks/data/ if present). Latency, error rate and challenge-page rate
+are configurable, so the parser can be measured without touching Ozon.
+
+Run standalone from the project root:
+    python -m benchmarks.fake_ozon --port 8081 --latency 0.2 --challenge-rate 0.05
+"""
+import argparse
+import asyncio
+import logging
+import random
+import threading
+from typing import List, Optional
+from aiohttp import web
+from benchmarks.payloads import load_recorded, make_composer_payload, make_product_html
+
+
+logger = logging.getLogger(__name__)
+
+API_PATH = "/api/composer-api.bx/page/json/v2"
+
+CHALLENGE_PAGE = (
+    "<html><head><title>Доступ ограничен</title></head>"
+    "<body><h1>Checking your browser before accessing ozon.ru</h1>"
+    "<p>Please enable JavaScript and cookies to continue</p></body></html>"
+)
+
+
+class FakeOzonServer:
+    """
+    aiohttp server imitating the Ozon endpoints the parser talks to.
+
+    Every article is answered with one of a few pre-generated payload
+    variants, so serving does not depend on payload generation speed
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8081,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        challenge_rate: float = 0.0,
+        variants: int = 8,
+        widgets: int = 350,
+        page_size: int = 1_500_000,
+        seed: int = 0
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.challenge_rate = challenge_rate
+        self._rng = random.Random(seed)
+
+        self._json_variants = [content for _, content in load_recorded(".json")]
+        self._html_variants = [content for _, content in load_recorded(".html")]
+        if not self._json_variants:
+            self._json_variants = [make_composer_payload(1000 + i, widgets=widgets, seed=seed) for i in range(variants)]
+        if not self._html_variants:
+            self._html_variants = [make_product_html(1000 + i, size=page_size, seed=seed) for i in range(variants)]
+
+        self.requests = 0
+        self.errors = 0
+        self.challenges = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}{API_PATH}"
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.handle_home)
+        app.router.add_get("/product/{article}/", self.handle_product)
+        app.router.add_get(API_PATH, self.handle_api)
+        return app
+
+    async def handle_home(self, request: web.Request) -> web.Response:
+        return web.Response(text="<html><body>Ozon</body></html>", content_type="text/html")
+
+    async def handle_product(self, request: web.Request) -> web.Response:
+        article = self._parse_article(request.match_info["article"])
+        if article is None:
+            return web.Response(status=404)
+        failure = await self._simulate()
+        if failure is not None:
+            return failure
+        return web.Response(text=self._pick(self._html_variants, article), content_type="text/html")
+
+    async def handle_api(self, request: web.Request) -> web.Response:
+        # url=/product/<article>/
+        article = self._parse_article(request.query.get("url", "").strip("/").split("/")[-1])
+        if article is None:
+            return web.Response(status=404)
+        failure = await self._simulate()
+        if failure is not None:
+            return failure
+        return web.Response(text=self._pick(self._json_variants, article), content_type="application/json")
+
+    async def _simulate(self) -> Optional[web.Response]:
+        """
+        Apply latency and return an error or challenge response if one is due
+        """
+        self.requests += 1
+        delay = self.latency + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = self._rng.random()
+        if roll < self.error_rate:
+            self.errors += 1
+            return web.Response(status=502, text="Bad Gateway")
+        if roll < self.error_rate + self.challenge_rate:
+            self.challenges += 1
+            return web.Response(status=403, text=CHALLENGE_PAGE, content_type="text/html")
+        return None
+
+    @staticmethod
+    def _parse_article(value: str) -> Optional[int]:
+        return int(value) if value.isdigit() else None
+
+    @staticmethod
+    def _pick(variants: List[str], article: int) -> str:
+        return variants[article % len(variants)]
+
+    def start(self):
+        """
+        Serve on a background event loop thread
+        """
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.make_app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            self._loop.run_until_complete(web.TCPSite(self._runner, self.host, self.port).start())
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-ozon", daemon=True)
+        self._thread.start()
+        started.wait()
+        logger.info(f"Fake Ozon server listening on {self.base_url}")
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "challenges": self.challenges
+        }
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.1, help="response delay, seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="random +/- added to the delay, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 502 responses")
+    parser.add_argument("--challenge-rate", type=float, default=0.0, help="share of anti-bot challenge pages")
+    parser.add_argument("--widgets", type=int, default=350, help="widgetStates per composer-api response")
+    parser.add_argument("--page-size", type=int, default=1_500_000, help="product page HTML size, bytes")
+
+
+def server_from_args(args: argparse.Namespace) -> FakeOzonServer:
+    return FakeOzonServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        challenge_rate=args.challenge_rate,
+        widgets=args.widgets,
+        page_size=args.page_size
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ozon server for benchmarks")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = server_from_args(args)
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Recorded and synthetic Ozon payloads for benchmarks.
+
+Recorded responses can be dropped into benchmarks/data/ as
+``<article>.json`` (composer-api response) and ``<article>.html``
+(product page). When none are present, payloads of realistic size and
+shape are generated deterministically.
+"""
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Префиксы виджетов, которые встречаются на странице товара
+WIDGET_PREFIXES = [
+    "webGallery", "webAddToCart", "webBreadCrumbs", "webCharacteristics",
+    "webDescription", "webReviewProductScore", "webCurrentSeller", "webDetailSKU",
+    "webAspects", "webMarketingLabels", "webOutOfStock", "webPdpGrid",
+    "webSearchResultsBanner", "webSellerList", "webShareLink", "webVideos",
+    "webPriceDecreasedCompact", "webBestSeller", "webInstallmentPurchase"
+]
+
+
+def _format_price(value: int) -> str:
+    return f"{value:,}".replace(",", " ") + " ₽"
+
+
+def make_composer_payload(article: int, widgets: int = 350, widget_size: int = 6000, seed: int = 0) -> str:
+    """
+    composer-api JSON with widgetStates of realistic size (~2 MB by default)
+    """
+    rng = random.Random(seed + article)
+    price = rng.randint(500, 150000)
+    widget_states: Dict[str, str] = {}
+
+    for i in range(widgets):
+        prefix = WIDGET_PREFIXES[i % len(WIDGET_PREFIXES)]
+        filler = {
+            "items": [
+                {"id": rng.randint(1, 10 ** 9), "text": "x" * rng.randint(20, 120), "link": f"/product/{rng.randint(1, 10 ** 9)}/"}
+                for _ in range(max(widget_size // 180, 1))
+            ]
+        }
+        widget_states[f"{prefix}-{rng.randint(10 ** 6, 10 ** 7)}-default-{i}"] = json.dumps(filler, ensure_ascii=False)
+
+    widget_states[f"webPrice-{rng.randint(10 ** 6, 10 ** 7)}-default-1"] = json.dumps({
+        "isAvailable": True,
+        "cardPrice": _format_price(int(price * 0.9)),
+        "price": _format_price(price),
+        "originalPrice": _format_price(int(price * 1.6))
+    }, ensure_ascii=False)
+    widget_states[f"webProductHeading-{rng.randint(10 ** 6, 10 ** 7)}-default-1"] = json.dumps({
+        "title": f"Товар {article} — тестовое название"
+    }, ensure_ascii=False)
+    widget_states[f"webStickyProducts-{rng.randint(10 ** 6, 10 ** 7)}-default-1"] = json.dumps({
+        "seller": {"name": f"Продавец {article % 97}", "link": f"/seller/{article % 97}/"}
+    }, ensure_ascii=False).replace('"', '&quot;')
+
+    # Виджеты в ответе идут вперемешку
+    items = list(widget_states.items())
+    rng.shuffle(items)
+
+    return json.dumps({
+        "layout": [{"component": key.split("-")[0], "stateId": key} for key, _ in items],
+        "widgetStates": dict(items),
+        "pageInfo": {"url": f"/product/{article}/", "pageType": "pdp"}
+    }, ensure_ascii=False)
+
+
+def make_product_html(article: int, size: int = 1_500_000, seed: int = 0) -> str:
+    """
+    Product page HTML with the price spans extract_price_from_html looks for
+    """
+    rng = random.Random(seed + article)
+    price = rng.randint(500, 150000)
+    blocks = []
+    total = 0
+
+    while total < size // 2:
+        block = f'<div class="a{rng.randint(0, 999)} b{rng.randint(0, 999)}"><span class="tsBodyM">{"текст " * rng.randint(3, 30)}</span></div>\n'
+        blocks.append(block)
+        total += len(block)
+
+    price_block = (
+        '<div class="price-block">'
+        f'<div>с Ozon Картой <span class="x1 tsHeadline600Large">{_format_price(int(price * 0.9))}</span></div>'
+        f'<span class="y2 tsBody500Medium">{_format_price(price)}</span>'
+        f'<span class="z3 tsBodyControl400Small">{_format_price(int(price * 1.6))}</span>'
+        '</div>\n'
+    )
+    head = "".join(blocks)
+    tail = "".join(blocks[::-1])
+    return f"<html><head><title>{article}</title></head><body>{head}{price_block}{tail}</body></html>"
+
+
+def make_adversarial_html(size: int = 1_000_000) -> str:
+    """
+    HTML built to make backtracking regexes slow: many unterminated class
+    attributes, spans without a currency sign and card-price labels without a span
+    """
+    chunk = (
+        '<span class="' + "tsBody " * 20 + '">' + "1 2 3 4 5 6 7 8 9 " * 5 + '</span>'
+        'с Ozon Картой ' + "9 " * 50 +
+        '<span class="tsBodyControl' + " x" * 30
+    )
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+
+def load_recorded(extension: str) -> List[Tuple[str, str]]:
+    """
+    Recorded payloads from benchmarks/data as (name, content)
+    """
+    if not os.path.isdir(DATA_DIR):
+        return []
+    recorded = []
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith(extension):
+            with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+                recorded.append((name, f.read()))
+    return recorded
+
+
+def composer_payloads(count: int = 5) -> List[Tuple[str, str]]:
+    recorded = load_recorded(".json")
+    if recorded:
+        return recorded
+    return [(f"synthetic-{article}.json", make_composer_payload(article)) for article in range(1000, 1000 + count)]
+
+
+def product_pages(count: int = 3) -> List[Tuple[str, str]]:
+    recorded = load_recorded(".html")
+    if recorded:
+        return recorded
+    return [(f"synthetic-{article}.html", make_product_html(article)) for article in range(1000, 1000 + count)]
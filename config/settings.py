@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -12,6 +12,12 @@ class Settings(BaseSettings):
     HEADLESS: bool = True
     IMPLICIT_WAIT: int = 20
     PAGE_LOAD_TIMEOUT: int = 60
+    CDP_CAPTURE_ENABLED: bool = True
+    CDP_EVENT_POLL_INTERVAL: float = 0.05
+    
+    # Resource blocking: "none", "light" (media + trackers) or "standard" (+ images, fonts)
+    BLOCKING_PROFILE: str = "standard"
+    BLOCKED_URL_PATTERNS_EXTRA: List[str] = []
     
     # Ozon settings
     OZON_BASE_URL: str = "https://www.ozon.ru"
@@ -27,6 +33,79 @@ class Settings(BaseSettings):
     MAX_ARTICLES_PER_WORKER: int = 10
     MAX_WORKERS: int = 5
     
+    # Driver pool settings
+    DRIVER_POOL_MIN_SIZE: int = 1
+    DRIVER_POOL_MAX_SIZE: int = 5
+    DRIVER_MAX_PAGES: int = 100
+    DRIVER_ACQUIRE_TIMEOUT: int = 300
+    # Больше 1: слоты пула - вкладки одного Chrome (DRIVER_POOL_MAX_SIZE считает вкладки)
+    DRIVER_TABS_PER_BROWSER: int = 1
+    DRIVER_MAX_MEMORY_MB: int = 1500
+    MEMORY_WATCHDOG_ENABLED: bool = True
+    MEMORY_WATCHDOG_INTERVAL: int = 30
+    
+    # Browserless HTTP fetch settings
+    HTTP_FETCH_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_CONNECTIONS_PER_HOST: int = 10
+    HTTP_KEEPALIVE_TIMEOUT: int = 30
+    HTTP_TIMEOUT: int = 15
+    
+    # Request pacing: "adaptive" (AIMD token bucket) or "conservative" (fixed random pauses)
+    PACING_MODE: str = "adaptive"
+    PACING_SETTLE_DELAY: float = 0.5
+    RATE_INITIAL: float = 0.5
+    RATE_MIN: float = 0.1
+    RATE_MAX: float = 5.0
+    RATE_INCREASE: float = 0.05
+    RATE_DECREASE_FACTOR: float = 0.5
+    RATE_BURST: float = 2.0
+    
+    # Shared browser session settings
+    SESSION_TTL: int = 1800
+    SESSION_REFRESH_MARGIN: int = 300
+    SESSION_CHECK_INTERVAL: int = 60
+    
+    # Result cache settings
+    CACHE_ENABLED: bool = True
+    CACHE_TTL: int = 900
+    CACHE_FAILURE_TTL: int = 60
+    CACHE_MAX_SIZE: int = 10000
+    CACHE_SQLITE_PATH: Optional[str] = None
+    
+    # Change tracking: last known values per article for changes_only / changed_since
+    CHANGE_TRACKING_ENABLED: bool = True
+    CHANGE_TRACKER_MAX_SIZE: int = 100000
+    CHANGE_TRACKER_PATH: Optional[str] = None
+    
+    # Price history: append-only columns in memory, optionally appended to files in PRICE_HISTORY_PATH
+    PRICE_HISTORY_ENABLED: bool = True
+    PRICE_HISTORY_PATH: Optional[str] = None
+    # Observations kept in memory: not older than N days and at most N rows (0 - no limit)
+    PRICE_HISTORY_RETENTION_DAYS: int = 90
+    PRICE_HISTORY_MAX_ROWS: int = 10000000
+    HISTORY_MAX_ARTICLES: int = 1000
+    
+    # Job settings
+    JOB_MAX_ARTICLES: int = 1000
+    JOB_MAX_JOBS: int = 100
+    JOB_TTL: int = 3600
+    JOB_QUEUE_PATH: Optional[str] = None
+    JOB_LEASE_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_QUEUE_WINDOW: int = 50
+    JOB_QUEUE_POLL_INTERVAL: float = 1.0
+    
+    # Worker mode: embedded (API parses itself) or external (worker.py processes consume JOB_QUEUE_PATH)
+    WORKER_MODE: str = "embedded"
+    QUEUE_RESULT_POLL_INTERVAL: float = 0.2
+    QUEUE_RESULT_TIMEOUT: int = 600
+    
+    # Bulk endpoint settings
+    BULK_MAX_ARTICLES: int = 10000
+    BULK_CHUNK_SIZE: int = 50
+    BULK_WINDOW: int = 100
+    
     # Browser settings
     USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
     
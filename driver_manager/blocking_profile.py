@@ -0,0 +1,66 @@
+import logging
+from typing import Dict, List
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# URL patterns for Network.setBlockedURLs ("*" is a wildcard)
+BLOCKED_URL_PATTERNS: Dict[str, List[str]] = {
+    "images": [
+        "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+        "*://ir.ozone.ru/*"
+    ],
+    "media": [
+        "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ogg",
+        "*://v.ozone.ru/*"
+    ],
+    "fonts": [
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"
+    ],
+    "trackers": [
+        "*://mc.yandex.ru/*",
+        "*://an.yandex.ru/*",
+        "*://yandex.ru/ads/*",
+        "*://www.google-analytics.com/*",
+        "*://www.googletagmanager.com/*",
+        "*://*.doubleclick.net/*",
+        "*://top-fwz1.mail.ru/*",
+        "*://vk.com/rtrg*",
+        "*://*.tiktok.com/*",
+        "*://xapi.ozon.ru/*"
+    ]
+}
+
+# Скрипты и запросы к composer-api не блокируются ни в одном профиле:
+# без них на странице не появятся widgetStates
+BLOCKING_PROFILES: Dict[str, List[str]] = {
+    "none": [],
+    "light": ["media", "trackers"],
+    "standard": ["images", "media", "fonts", "trackers"]
+}
+
+
+def get_blocked_url_patterns(profile: str) -> List[str]:
+    """
+    URL patterns to block for a blocking profile
+    """
+    if profile not in BLOCKING_PROFILES:
+        logger.warning(f"Unknown blocking profile '{profile}', using 'none'")
+        profile = "none"
+
+    patterns = []
+    for category in BLOCKING_PROFILES[profile]:
+        patterns.extend(BLOCKED_URL_PATTERNS[category])
+    patterns.extend(settings.BLOCKED_URL_PATTERNS_EXTRA)
+    return patterns
+
+
+def get_content_settings_prefs(profile: str) -> Dict[str, int]:
+    """
+    Chrome content settings prefs for a blocking profile (2 = block)
+    """
+    prefs = {}
+    if "images" in BLOCKING_PROFILES.get(profile, []):
+        prefs["profile.managed_default_content_settings.images"] = 2
+    return prefs
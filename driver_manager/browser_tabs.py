@@ -0,0 +1,328 @@
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from driver_manager.selenium_manager import SeleniumManager
+from driver_manager.session_store import SessionStore
+from driver_manager.memory_watchdog import driver_processes, reap_processes
+from config.settings import settings
+from utils.metrics import stage_timer
+
+
+logger = logging.getLogger(__name__)
+
+# Вкладка, из которой пришло событие performance-лога
+_WEBVIEW_RE = re.compile(r'"webview"\s*:\s*"([^"]+)"')
+
+# Метка на старой странице: пока она видна, навигация еще не началась
+_LOAD_MARKER_SCRIPT = "window.__ozonPendingLoad = true"
+_READY_SCRIPT = "return window.__ozonPendingLoad === undefined && document.readyState === 'complete'"
+
+
+def target_id(handle: str) -> str:
+    # Старые chromedriver отдают хэндлы вида CDwindow-<targetId>
+    return handle[len("CDwindow-"):] if handle.startswith("CDwindow-") else handle
+
+
+def event_target(message: str) -> Optional[str]:
+    """
+    Target id of a performance log message ("webview" goes last)
+    """
+    match = _WEBVIEW_RE.search(message, max(message.rfind('"webview"'), 0))
+    return match.group(1) if match else None
+
+
+class SharedBrowser:
+    """
+    One Chrome process serving several tabs.
+
+    WebDriver commands are serialized under a lock and address a tab by
+    switching to its window. Pages load with pageLoadStrategy=none and
+    readiness is polled outside the lock, so navigations of different tabs
+    run concurrently. Performance log events are routed to tabs by target id
+    """
+
+    def __init__(self):
+        self.driver: Optional[webdriver.Chrome] = None
+        self.service_pid: Optional[int] = None
+        self.lock = threading.RLock()
+        # Новые вкладки сюда больше не открываются, Chrome закроется с последней
+        self.retiring = False
+        self.closed = False
+
+        self._tabs: Set[str] = set()
+        self._current: Optional[str] = None
+        # Первое окно Chrome, еще не отданное вкладке
+        self._spare: Optional[str] = None
+        self._events: Dict[str, List[dict]] = defaultdict(list)
+
+    def start(self):
+        options = SeleniumManager.build_options(page_load_strategy="none")
+        service = Service()
+        self.driver = webdriver.Chrome(service=service, options=options)
+        self.service_pid = service.process.pid if service.process else None
+        self._spare = self._current = self.driver.current_window_handle
+        logger.info(f"Shared Chrome started (pid {self.service_pid})")
+
+    @property
+    def tab_count(self) -> int:
+        with self.lock:
+            return len(self._tabs)
+
+    def open_tab(self) -> str:
+        with self.lock:
+            if self.closed:
+                raise WebDriverException("Shared browser is closed")
+            if self._spare:
+                handle, self._spare = self._spare, None
+                self._switch(handle)
+            else:
+                self.driver.switch_to.new_window("tab")
+                handle = self._current = self.driver.current_window_handle
+            self._tabs.add(handle)
+            try:
+                SeleniumManager.prepare_target(self.driver)
+            except Exception:
+                self.close_tab(handle)
+                raise
+        return handle
+
+    def close_tab(self, handle: str):
+        """
+        Close a tab; Chrome quits together with its last tab
+        """
+        with self.lock:
+            if handle not in self._tabs:
+                return
+            self._tabs.discard(handle)
+            self._events.pop(target_id(handle), None)
+
+            if self._tabs:
+                try:
+                    self._switch(handle)
+                    self.driver.close()
+                except WebDriverException as e:
+                    logger.warning(f"Failed to close tab: {e}")
+                self._current = None
+                return
+
+            # Последняя вкладка: закрываемся, новые вкладки сюда уже не откроются
+            self.closed = True
+            driver, self.driver = self.driver, None
+
+        self._shutdown(driver)
+
+    @contextmanager
+    def use(self, handle: str) -> Iterator[webdriver.Chrome]:
+        """
+        Exclusive access to the driver switched to the given tab
+        """
+        with self.lock:
+            if handle not in self._tabs:
+                raise WebDriverException("Tab is closed")
+            self._switch(handle)
+            yield self.driver
+
+    def performance_events(self, handle: str) -> List[dict]:
+        """
+        Buffered performance log entries of one tab
+        """
+        with self.lock:
+            try:
+                entries = self.driver.get_log("performance")
+            except WebDriverException as e:
+                logger.debug(f"Failed to read performance log: {e}")
+                entries = []
+
+            known = {target_id(tab) for tab in self._tabs}
+            for entry in entries:
+                target = event_target(entry.get("message", ""))
+                if target in known:
+                    self._events[target].append(entry)
+
+            return self._events.pop(target_id(handle), [])
+
+    def quit(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            driver, self.driver = self.driver, None
+        self._shutdown(driver)
+
+    def _shutdown(self, driver: webdriver.Chrome):
+        processes = driver_processes(self.service_pid)
+        try:
+            driver.quit()
+            logger.info(f"Shared Chrome closed (pid {self.service_pid})")
+        except Exception as e:
+            logger.error(f"Error closing shared Chrome: {e}")
+        finally:
+            reap_processes(processes)
+
+    def _switch(self, handle: str):
+        if self._current != handle:
+            self.driver.switch_to.window(handle)
+            self._current = handle
+
+
+class TabDriver:
+    """
+    The part of the WebDriver API SeleniumManager uses, bound to one tab
+    of a SharedBrowser. Each call holds the browser lock only briefly
+    """
+
+    def __init__(self, browser: SharedBrowser, handle: str):
+        self.browser = browser
+        self.handle = handle
+
+    def get(self, url: str):
+        with self.browser.use(self.handle) as driver:
+            driver.execute_script(_LOAD_MARKER_SCRIPT)
+            driver.get(url)
+
+        # Ждем загрузку без блокировки: остальные вкладки тем временем работают
+        deadline = time.monotonic() + settings.PAGE_LOAD_TIMEOUT
+        while True:
+            try:
+                with self.browser.use(self.handle) as driver:
+                    if driver.execute_script(_READY_SCRIPT):
+                        return
+            except WebDriverException as e:
+                # Пока документ сменяется, скрипт может упасть - это не ошибка драйвера
+                if self.browser.closed:
+                    raise
+                logger.debug(f"Tab not ready yet: {e}")
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"Page load timed out after {settings.PAGE_LOAD_TIMEOUT}s: {url}")
+            time.sleep(settings.CDP_EVENT_POLL_INTERVAL)
+
+    @property
+    def page_source(self) -> str:
+        with self.browser.use(self.handle) as driver:
+            return driver.page_source
+
+    @property
+    def current_url(self) -> str:
+        with self.browser.use(self.handle) as driver:
+            return driver.current_url
+
+    @property
+    def title(self) -> str:
+        with self.browser.use(self.handle) as driver:
+            return driver.title
+
+    def execute_script(self, script: str, *args):
+        with self.browser.use(self.handle) as driver:
+            return driver.execute_script(script, *args)
+
+    def execute_cdp_cmd(self, cmd: str, cmd_args: dict):
+        with self.browser.use(self.handle) as driver:
+            return driver.execute_cdp_cmd(cmd, cmd_args)
+
+    def get_cookies(self) -> List[dict]:
+        with self.browser.use(self.handle) as driver:
+            return driver.get_cookies()
+
+    def get_log(self, log_type: str) -> List[dict]:
+        if log_type == "performance":
+            return self.browser.performance_events(self.handle)
+        with self.browser.use(self.handle) as driver:
+            return driver.get_log(log_type)
+
+    def quit(self):
+        self.browser.close_tab(self.handle)
+
+
+class TabSlot(SeleniumManager):
+    """
+    Scraping slot backed by a tab of a shared Chrome instead of its own process.
+    Navigation, capture and session handling are inherited unchanged
+    """
+
+    def __init__(self, factory: "TabbedBrowserFactory", session_store: Optional[SessionStore] = None):
+        super().__init__(session_store)
+        self.factory = factory
+        self.browser: Optional[SharedBrowser] = None
+
+    @stage_timer("setup_driver")
+    def setup_driver(self) -> TabDriver:
+        self.browser, handle = self.factory.open_tab()
+        self.service_pid = self.browser.service_pid
+        driver = TabDriver(self.browser, handle)
+        self.attach(driver)
+        logger.info(f"Tab opened in shared Chrome (pid {self.service_pid}, {self.browser.tab_count} tabs)")
+        return driver
+
+    def close(self):
+        """
+        Close the tab; processes are reaped when the whole browser quits
+        """
+        if not self.driver:
+            return
+        # Браузер, переросший бюджет памяти, больше не получает вкладок
+        if self.recycle_requested and self.browser:
+            self.browser.retiring = True
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.error(f"Error closing tab: {e}")
+        finally:
+            self.driver = None
+            self.wait = None
+
+
+class TabbedBrowserFactory:
+    """
+    Driver factory for DriverPool: every slot is a tab, up to
+    tabs_per_browser tabs are packed into one Chrome
+    """
+
+    def __init__(self, tabs_per_browser: Optional[int] = None, session_store: Optional[SessionStore] = None):
+        self.tabs_per_browser = settings.DRIVER_TABS_PER_BROWSER if tabs_per_browser is None else tabs_per_browser
+        self.session_store = session_store
+        self._browsers: List[SharedBrowser] = []
+        # Вкладки, которые открываются прямо сейчас, по браузерам
+        self._opening: Dict[int, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __call__(self) -> TabSlot:
+        return TabSlot(self, self.session_store)
+
+    def open_tab(self, retry: bool = True) -> Tuple[SharedBrowser, str]:
+        with self._lock:
+            self._browsers = [browser for browser in self._browsers if not browser.closed]
+            browser = next((
+                browser for browser in self._browsers
+                if not browser.retiring
+                and browser.tab_count + self._opening[id(browser)] < self.tabs_per_browser
+            ), None)
+            if browser is None:
+                # Запуск Chrome под блокировкой: параллельные слоты не плодят полупустые браузеры
+                browser = SharedBrowser()
+                browser.start()
+                self._browsers.append(browser)
+            self._opening[id(browser)] += 1
+
+        try:
+            return browser, browser.open_tab()
+        except WebDriverException:
+            # Браузер закрылся вместе с последней вкладкой, пока мы его выбирали
+            if not browser.closed or not retry:
+                raise
+            return self.open_tab(retry=False)
+        finally:
+            with self._lock:
+                self._opening[id(browser)] -= 1
+                if not self._opening[id(browser)]:
+                    del self._opening[id(browser)]
+
+    def browsers(self) -> List[SharedBrowser]:
+        with self._lock:
+            return [browser for browser in self._browsers if not browser.closed]
@@ -0,0 +1,267 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+from driver_manager.selenium_manager import SeleniumManager
+from config.settings import settings
+from utils.metrics import stage_timer
+
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPool:
+    """
+    Pool of long-lived Chrome drivers with checkout/checkin semantics
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], SeleniumManager] = SeleniumManager,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        max_pages: Optional[int] = None
+    ):
+        self.factory = factory
+        self.min_size = settings.DRIVER_POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = settings.DRIVER_POOL_MAX_SIZE if max_size is None else max_size
+        self.max_pages = settings.DRIVER_MAX_PAGES if max_pages is None else max_pages
+        self.min_size = min(self.min_size, self.max_size)
+
+        self._idle: List[SeleniumManager] = []
+        self._in_use: List[SeleniumManager] = []
+        # Количество драйверов, включая те, что сейчас запускаются
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.created_total = 0
+        self.recycled_total = 0
+
+    def start(self):
+        """
+        Warm up the pool up to min_size drivers
+        """
+        with self._cond:
+            missing = self.min_size - self._size
+            self._size += max(missing, 0)
+
+        for _ in range(max(missing, 0)):
+            try:
+                manager = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self._put_idle(manager)
+
+        logger.info(f"Driver pool started: {self._size} drivers (min={self.min_size}, max={self.max_size})")
+
+    @stage_timer("driver_acquire")
+    def acquire(self, timeout: Optional[float] = None) -> SeleniumManager:
+        """
+        Check out a healthy driver, launching a new one if the pool is not full
+        """
+        if timeout is None:
+            timeout = settings.DRIVER_ACQUIRE_TIMEOUT
+        deadline = time.monotonic() + timeout
+
+        while True:
+            manager = None
+            launch = False
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+                    if self._idle:
+                        # LIFO: берем самый "горячий" драйвер
+                        manager = self._idle.pop()
+                        self._in_use.append(manager)
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        launch = True
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No driver available after {timeout} seconds")
+                    self._cond.wait(remaining)
+
+            if launch:
+                try:
+                    manager = self._create()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._in_use.append(manager)
+                return manager
+
+            if self._is_reusable(manager):
+                return manager
+
+            # Драйвер устарел или сломан - пересоздаем и пробуем снова
+            self._discard(manager)
+
+    def release(self, manager: SeleniumManager):
+        """
+        Return a driver to the pool, recycling it if it is worn out or broken
+        """
+        with self._cond:
+            if manager in self._in_use:
+                self._in_use.remove(manager)
+            closed = self._closed
+
+        if closed or not self._is_reusable(manager, check_health=False):
+            self._discard(manager)
+            if not closed:
+                self._replenish()
+            return
+
+        self._put_idle(manager)
+
+    def recycle(self, manager: SeleniumManager):
+        """
+        Replace a driver: an idle one right away, a checked out one on release
+        """
+        with self._cond:
+            manager.recycle_requested = True
+            idle = manager in self._idle
+            if idle:
+                self._idle.remove(manager)
+
+        if idle:
+            self._discard(manager)
+            self._replenish()
+
+    def managers(self) -> List[SeleniumManager]:
+        """
+        Snapshot of all launched drivers, idle and checked out
+        """
+        with self._cond:
+            return self._idle + self._in_use
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[SeleniumManager]:
+        """
+        Context manager around acquire/release
+        """
+        manager = self.acquire(timeout)
+        try:
+            yield manager
+        finally:
+            self.release(manager)
+
+    def stats(self) -> dict:
+        """
+        Current pool occupancy
+        """
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "created_total": self.created_total,
+                "recycled_total": self.recycled_total,
+                "drivers": self._driver_stats()
+            }
+
+    def _driver_stats(self) -> List[dict]:
+        """
+        One entry per chromedriver process tree; tabs of a shared Chrome are summed up
+        """
+        drivers: Dict[int, dict] = {}
+        for manager in self._idle + self._in_use:
+            # Без pid (еще не запущен) каждый слот идет отдельно
+            key = manager.service_pid or id(manager)
+            driver = drivers.setdefault(key, {
+                "pid": manager.service_pid,
+                "slots": 0,
+                "slots_in_use": 0,
+                "pages": 0,
+                "rss_mb": round(manager.memory_rss / 1024 / 1024, 1)
+            })
+            driver["slots"] += 1
+            driver["slots_in_use"] += manager in self._in_use
+            driver["pages"] += manager.pages_loaded
+        return list(drivers.values())
+
+    def close(self):
+        """
+        Close all idle drivers; checked out drivers are closed on release
+        """
+        with self._cond:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._cond.notify_all()
+
+        for manager in idle:
+            self._discard(manager, recycled=False)
+
+        logger.info("Driver pool closed")
+
+    def _create(self) -> SeleniumManager:
+        manager = self.factory()
+        manager.setup_driver()
+        with self._cond:
+            self.created_total += 1
+        return manager
+
+    def _put_idle(self, manager: SeleniumManager):
+        with self._cond:
+            if self._closed:
+                discard = True
+            else:
+                discard = False
+                self._idle.append(manager)
+                self._cond.notify()
+        if discard:
+            self._discard(manager, recycled=False)
+
+    def _is_reusable(self, manager: SeleniumManager, check_health: bool = True) -> bool:
+        if manager.failed or not manager.driver:
+            return False
+        if manager.recycle_requested:
+            logger.info(f"Recycling driver over memory budget ({manager.memory_rss / 1024 / 1024:.0f} MB)")
+            return False
+        if self.max_pages and manager.pages_loaded >= self.max_pages:
+            logger.info(f"Recycling driver after {manager.pages_loaded} pages")
+            return False
+        if check_health:
+            return manager.is_healthy()
+        return True
+
+    def _discard(self, manager: SeleniumManager, recycled: bool = True):
+        try:
+            manager.close()
+        finally:
+            with self._cond:
+                self._size -= 1
+                if recycled:
+                    self.recycled_total += 1
+                self._cond.notify()
+
+    def _replenish(self):
+        """
+        Keep the pool warm after a driver was recycled
+        """
+        with self._cond:
+            if self._closed or self._size >= self.min_size:
+                return
+
+        def _warm():
+            try:
+                self.start()
+            except Exception as e:
+                logger.error(f"Failed to replenish driver pool: {e}")
+
+        threading.Thread(target=_warm, name="driver-pool-warmup", daemon=True).start()
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+import aiohttp
+from config.settings import settings
+from driver_manager.session_store import SessionStore
+from utils.helpers import build_ozon_api_url_fallback, is_challenge_page
+from utils.rate_limiter import get_pacer
+from utils.metrics import BLOCKS, observe_stage, stage_timer
+
+
+logger = logging.getLogger(__name__)
+
+# Статусы, которыми антибот отвечает вместо данных
+CHALLENGE_STATUSES = {403, 429}
+
+
+class HttpFetchResult:
+    def __init__(self, content: Optional[str] = None, status: int = 0, challenge: bool = False, error: Optional[str] = None):
+        self.content = content
+        self.status = status
+        self.challenge = challenge
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.content is not None and not self.challenge
+
+    @property
+    def needs_browser(self) -> bool:
+        """
+        Challenge or no HTTP answer at all: only a browser can get the data.
+        An ordinary error status (404 of a missing article, 5xx) is final
+        """
+        return self.challenge or not self.status
+
+
+class OzonHttpFetcher:
+    """
+    Browserless fetcher for composer-api JSON.
+
+    Owns a keep-alive aiohttp session running on its own event loop thread,
+    so it can be used both from async code and from the parser worker threads.
+    """
+
+    def __init__(self, session_store: Optional[SessionStore] = None):
+        self.session_store = session_store
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the event loop thread and open the pooled session
+        """
+        with self._lock:
+            if self._loop:
+                return
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="ozon-http-fetcher", daemon=True)
+            thread.start()
+
+            self._session = asyncio.run_coroutine_threadsafe(self._create_session(), loop).result()
+            self._loop = loop
+            self._thread = thread
+
+        logger.info("HTTP fetcher started")
+
+    async def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_MAX_CONNECTIONS,
+            limit_per_host=settings.HTTP_CONNECTIONS_PER_HOST,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT),
+            auto_decompress=True,
+            # Куки берем из общей сессии браузера, а не копим свои
+            cookie_jar=aiohttp.DummyCookieJar(),
+            headers={
+                "User-Agent": settings.USER_AGENT,
+                "Accept": "application/json, text/plain, */*",
+                "Accept-Encoding": "gzip, deflate",
+                "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7"
+            }
+        )
+
+    async def fetch_product_json(self, article: int) -> HttpFetchResult:
+        """
+        Request composer-api JSON for article directly
+        """
+        if not self._session:
+            return HttpFetchResult(error="HTTP fetcher not started")
+
+        url = build_ozon_api_url_fallback(article)
+
+        headers = {}
+        browser_session = self.session_store.current() if self.session_store else None
+        if browser_session:
+            headers["User-Agent"] = browser_session.user_agent
+            headers["Cookie"] = browser_session.cookie_header
+
+        started = time.perf_counter()
+        try:
+            async with self._session.get(url, headers=headers) as response:
+                text = await response.text()
+                content_type = response.headers.get("Content-Type", "")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"HTTP fetch failed for article {article}: {e!r}")
+            return HttpFetchResult(error=str(e) or type(e).__name__)
+        finally:
+            observe_stage("http_fetch", time.perf_counter() - started)
+
+        if response.status in CHALLENGE_STATUSES or is_challenge_page(text):
+            logger.warning(f"Challenge page for article {article} (status {response.status})")
+            get_pacer().record_block(url)
+            BLOCKS.labels("http").inc()
+            if browser_session:
+                self.session_store.invalidate(browser_session.version, "HTTP fetcher got challenge page")
+            return HttpFetchResult(status=response.status, challenge=True)
+
+        # 404 снятого товара, 5xx и прочее - обычная ошибка: темп и сессию не трогаем
+        if response.status != 200 or "json" not in content_type:
+            logger.warning(f"HTTP fetch for article {article} returned status {response.status} ({content_type or 'no content type'})")
+            error = f"HTTP {response.status}" if response.status != 200 else f"non-JSON response ({content_type or 'no content type'})"
+            return HttpFetchResult(status=response.status, error=error)
+
+        get_pacer().record_success(url)
+        return HttpFetchResult(content=text, status=response.status)
+
+    def fetch_product_json_blocking(self, article: int) -> HttpFetchResult:
+        """
+        Same as fetch_product_json, for use from worker threads.
+        Waits for the shared rate limiter before sending the request
+        """
+        if not self._loop:
+            return HttpFetchResult(error="HTTP fetcher not started")
+
+        with stage_timer("pacing_wait"):
+            get_pacer().wait_before_request(build_ozon_api_url_fallback(article))
+
+        future = asyncio.run_coroutine_threadsafe(self.fetch_product_json(article), self._loop)
+        return future.result()
+
+    def close(self):
+        """
+        Close the session and stop the event loop thread
+        """
+        with self._lock:
+            loop, session = self._loop, self._session
+            self._loop = None
+            self._session = None
+
+        if not loop:
+            return
+
+        try:
+            if session:
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.error(f"Error closing HTTP session: {e}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            if self._thread:
+                self._thread.join(timeout=5)
+            loop.close()
+
+        logger.info("HTTP fetcher closed")
@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from config.settings import settings
+from utils.metrics import MEMORY_RECYCLES, REAPED_PROCESSES
+
+
+logger = logging.getLogger(__name__)
+
+# Замер памяти и уборка процессов работают, если установлен psutil (pip install psutil)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def driver_processes(pid: Optional[int]) -> List["psutil.Process"]:
+    """
+    chromedriver process and all its descendants (Chrome browser, renderers, GPU)
+    """
+    if psutil is None or not pid:
+        return []
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def tree_rss(processes: Iterable["psutil.Process"]) -> int:
+    """
+    Resident memory of a process tree, bytes
+    """
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+def reap_processes(processes: Iterable["psutil.Process"], grace: float = 3, timeout: float = 5) -> int:
+    """
+    Give processes grace seconds to exit on their own, then terminate the
+    rest and kill those that ignore SIGTERM. Returns how many were reaped
+    """
+    # is_running() сверяет время создания - чужой процесс с тем же pid не тронем
+    alive = [process for process in processes if _is_alive(process)]
+    if alive and grace:
+        _, alive = psutil.wait_procs(alive, timeout=grace)
+    if not alive:
+        return 0
+
+    for process in alive:
+        try:
+            process.terminate()
+        except psutil.Error:
+            pass
+    _, survivors = psutil.wait_procs(alive, timeout=timeout)
+    for process in survivors:
+        try:
+            process.kill()
+        except psutil.Error:
+            pass
+
+    REAPED_PROCESSES.inc(len(alive))
+    logger.warning(f"Reaped {len(alive)} leftover browser processes: {[process.pid for process in alive]}")
+    return len(alive)
+
+
+def _is_alive(process: "psutil.Process") -> bool:
+    try:
+        return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
+    except psutil.Error:
+        return False
+
+
+class MemoryWatchdog:
+    """
+    Samples the RSS of every pooled driver's process tree, recycles drivers
+    over the memory budget and reaps chromedriver processes the pool lost
+    track of (e.g. after a failed quit)
+    """
+
+    def __init__(self, pool, interval: Optional[float] = None, max_memory_mb: Optional[int] = None):
+        self.pool = pool
+        self.interval = settings.MEMORY_WATCHDOG_INTERVAL if interval is None else interval
+        self.max_memory_mb = settings.DRIVER_MAX_MEMORY_MB if max_memory_mb is None else max_memory_mb
+
+        # Неизвестные пулу chromedriver с прошлого обхода: pid -> процесс
+        self._suspects: Dict[int, "psutil.Process"] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if psutil is None:
+            logger.warning("psutil is not installed, driver memory watchdog is disabled")
+            return
+        self._thread = threading.Thread(target=self._run, name="driver-memory-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Driver memory watchdog started: budget {self.max_memory_mb} MB, every {self.interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Driver memory check failed: {e}")
+
+    def check(self):
+        """
+        One sweep: sample, recycle drivers over budget, reap orphans
+        """
+        managers = self.pool.managers()
+
+        # Вкладки одного Chrome делят процессы: меряем дерево один раз на браузер
+        by_pid: Dict[int, List] = defaultdict(list)
+        for manager in managers:
+            if manager.service_pid:
+                by_pid[manager.service_pid].append(manager)
+
+        for pid, slots in by_pid.items():
+            processes = driver_processes(pid)
+            if not processes:
+                continue
+            rss = tree_rss(processes)
+            for manager in slots:
+                manager.processes = processes
+                manager.memory_rss = rss
+
+            # Бюджет задан на слот, общий Chrome получает его на каждую вкладку
+            budget = self.max_memory_mb * len(slots) * 1024 * 1024
+            pending = [manager for manager in slots if not manager.recycle_requested]
+            if budget and rss > budget and pending:
+                logger.info(
+                    f"Driver {pid} ({len(slots)} slots) uses {rss / 1024 / 1024:.0f} MB "
+                    f"(budget {budget / 1024 / 1024:.0f} MB), recycling"
+                )
+                MEMORY_RECYCLES.inc()
+                for manager in pending:
+                    self.pool.recycle(manager)
+
+        self.reap_orphans(set(by_pid))
+
+    def reap_orphans(self, owned_pids: set) -> int:
+        """
+        Kill chromedriver children of this process that no pooled driver owns.
+        A process is reaped only if it was unowned on two sweeps in a row,
+        so a driver that is just starting up is left alone
+        """
+        unowned = {}
+        for child in psutil.Process(os.getpid()).children():
+            try:
+                if child.pid not in owned_pids and "chromedriver" in child.name().lower():
+                    unowned[child.pid] = child
+            except psutil.Error:
+                continue
+
+        orphans = [process for pid, process in unowned.items() if pid in self._suspects]
+        self._suspects = {pid: process for pid, process in unowned.items() if pid not in self._suspects}
+
+        reaped = 0
+        for orphan in orphans:
+            reaped += reap_processes(driver_processes(orphan.pid), grace=0)
+        return reaped
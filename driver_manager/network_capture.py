@@ -0,0 +1,121 @@
+import base64
+import json
+import logging
+import time
+from typing import Callable, Dict, Optional
+from selenium.common.exceptions import WebDriverException
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Ответы Ozon, в которых приходят widgetStates
+DATA_URL_MARKERS = (
+    "/api/composer-api.bx/",
+    "/api/entrypoint-api.bx/"
+)
+
+
+def is_data_url(url: str) -> bool:
+    return any(marker in url for marker in DATA_URL_MARKERS)
+
+
+class NetworkCapture:
+    """
+    Captures response bodies from Chrome DevTools Protocol network events.
+
+    Events come from the chromedriver performance log, which buffers
+    Network.* events as they happen; a wait ends on the
+    Network.loadingFinished event of the matching response.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        # requestId -> url of responses we are interested in
+        self._tracked: Dict[str, str] = {}
+        self._finished: Dict[str, str] = {}
+        # Статистика трафика с последнего reset()
+        self.transferred_bytes = 0
+        self.blocked_requests = 0
+
+    def reset(self):
+        """
+        Forget events of previous navigations
+        """
+        self._drain(lambda url: False)
+        self._tracked.clear()
+        self._finished.clear()
+        self.transferred_bytes = 0
+        self.blocked_requests = 0
+
+    def collect(self, predicate: Callable[[str], bool] = is_data_url) -> Optional[str]:
+        """
+        Body of a matching response that has already finished loading, without waiting
+        """
+        request_id = self._drain(predicate)
+        if request_id:
+            return self._get_body(request_id)
+        return None
+
+    def wait_for_response(self, predicate: Callable[[str], bool] = is_data_url, timeout: float = 30) -> Optional[str]:
+        """
+        Wait until a matching response has finished loading and return its body
+        """
+        deadline = time.monotonic() + timeout
+
+        while True:
+            request_id = self._drain(predicate)
+            if request_id:
+                return self._get_body(request_id)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(settings.CDP_EVENT_POLL_INTERVAL)
+
+    def _drain(self, predicate: Callable[[str], bool]) -> Optional[str]:
+        """
+        Process buffered events, returns requestId of the first finished matching response
+        """
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException as e:
+            logger.debug(f"Failed to read performance log: {e}")
+            return None
+
+        for entry in entries:
+            message = entry.get("message", "")
+            # Быстрый отсев - разбираем JSON только нужных событий
+            if "Network.responseReceived" in message:
+                params = json.loads(message)["message"]["params"]
+                url = params.get("response", {}).get("url", "")
+                if predicate(url):
+                    self._tracked[params["requestId"]] = url
+            elif "Network.loadingFinished" in message:
+                params = json.loads(message)["message"]["params"]
+                request_id = params["requestId"]
+                self.transferred_bytes += int(params.get("encodedDataLength", 0))
+                if request_id in self._tracked:
+                    self._finished[request_id] = self._tracked.pop(request_id)
+            elif "Network.loadingFailed" in message:
+                params = json.loads(message)["message"]["params"]
+                if params.get("blockedReason"):
+                    self.blocked_requests += 1
+                self._tracked.pop(params["requestId"], None)
+
+        if self._finished:
+            request_id = next(iter(self._finished))
+            url = self._finished.pop(request_id)
+            logger.debug(f"Captured response: {url}")
+            return request_id
+        return None
+
+    def _get_body(self, request_id: str) -> Optional[str]:
+        try:
+            response = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except WebDriverException as e:
+            logger.warning(f"Failed to get response body: {e}")
+            return None
+
+        body = response.get("body", "")
+        if response.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", errors="replace")
+        return body
@@ -0,0 +1,98 @@
+import logging
+from functools import cached_property
+from typing import Optional
+from models.schemas import PriceInfo
+from utils.helpers import BLOCKED_INDICATORS, extract_json_from_html, extract_price_from_html
+from utils.widget_index import WidgetIndex
+
+
+logger = logging.getLogger(__name__)
+
+
+class PageSnapshot:
+    """
+    Page source read once after a navigation.
+
+    Every consumer of the page shares one snapshot instead of pulling
+    page_source over WebDriver again; derived views are computed on first
+    access and cached.
+    """
+
+    def __init__(self, source: str, url: str = ""):
+        self.source = source or ""
+        self.url = url
+
+    @classmethod
+    def from_driver(cls, driver, url: str = "") -> "PageSnapshot":
+        """
+        Serialize the current DOM once. Raises WebDriverException if the driver is gone
+        """
+        return cls(driver.page_source, url)
+
+    @cached_property
+    def lowered(self) -> str:
+        return self.source.lower()
+
+    @cached_property
+    def json_content(self) -> Optional[str]:
+        """
+        JSON body of the page (Chrome wraps API responses in <pre>)
+        """
+        return extract_json_from_html(self.source)
+
+    @cached_property
+    def widget_index(self) -> Optional[WidgetIndex]:
+        """
+        Indexed widgetStates if the page is a composer-api response
+        """
+        json_content = self.json_content
+        if not json_content or '"widgetStates"' not in json_content:
+            return None
+        try:
+            return WidgetIndex.from_json(json_content)
+        except ValueError as e:
+            logger.debug(f"Page JSON is not valid: {e}")
+            return None
+
+    @cached_property
+    def price_info(self) -> Optional[PriceInfo]:
+        """
+        Prices scraped from the product page HTML
+        """
+        return extract_price_from_html(self.source)
+
+    def is_blocked(self) -> bool:
+        """
+        Check the page for anti-bot protection indicators
+        """
+        lowered = self.lowered
+        return any(indicator in lowered for indicator in BLOCKED_INDICATORS)
+
+    def log_debug(self):
+        """
+        Dump page details; computed only when debug logging is enabled
+        """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+
+        logger.debug(f"Page {self.url}: {len(self.source)} chars, starts with: {self.source[:200]}")
+
+        if '<pre' in self.lowered:
+            json_content = self.json_content
+            if json_content:
+                logger.debug(f"Extracted JSON length: {len(json_content)}, starts with: {json_content[:100]}")
+                widget_index = self.widget_index
+                if widget_index:
+                    logger.debug(f"Extracted JSON contains {len(widget_index)} widget states")
+                else:
+                    logger.debug("Extracted JSON does not contain widgetStates")
+            else:
+                logger.debug("Could not extract JSON from <pre> tag")
+
+        if 'script' in self.lowered:
+            logger.debug("Page contains JavaScript")
+
+        if self.source.lstrip().startswith('{'):
+            logger.debug("Page contains direct JSON structure")
+        else:
+            logger.debug("Page contains HTML wrapper")
@@ -1,30 +1,76 @@
 import logging
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium_stealth import stealth
 from config.settings import settings
-from typing import Optional
-import time
-import json
+from utils.helpers import extract_json_from_html
+from utils.rate_limiter import get_pacer
+from utils.metrics import BLOCKS, stage_timer
+from driver_manager.session_store import BrowserSession, SessionStore
+from driver_manager.network_capture import NetworkCapture, is_data_url
+from driver_manager.page_snapshot import PageSnapshot
+from driver_manager.blocking_profile import get_blocked_url_patterns, get_content_settings_prefs
+from driver_manager.memory_watchdog import driver_processes, reap_processes
+from typing import List, Optional
 
 
 logger = logging.getLogger(__name__)
 
 
 class SeleniumManager:
-    def __init__(self):
+    def __init__(self, session_store: Optional[SessionStore] = None):
         self.driver: Optional[webdriver.Chrome] = None
         self.wait: Optional[WebDriverWait] = None
+        self.pages_loaded = 0
+        self.failed = False
+        self.session_store = session_store
+        # Версия общей сессии, загруженной в этот драйвер
+        self.session_version = 0
+        self.capture: Optional[NetworkCapture] = None
+        # JSON с widgetStates, перехваченный во время последней навигации
+        self.captured_json: Optional[str] = None
+        # Снимок страницы последней навигации, читается лениво
+        self.snapshot: Optional[PageSnapshot] = None
+        self.snapshot_url = ""
+        self.last_transferred_bytes = 0
+        self.transferred_bytes_total = 0
+        # chromedriver pid и дерево процессов с последнего замера (см. MemoryWatchdog)
+        self.service_pid: Optional[int] = None
+        self.processes: List = []
+        self.memory_rss = 0
+        self.recycle_requested = False
     
+    @stage_timer("setup_driver")
     def setup_driver(self) -> webdriver.Chrome:
         """
         Setup Chrome driver with stealth configuration
         """
+        chrome_options = self.build_options()
+        
+        try:
+            # Используем selenium-manager для автоматического управления драйверами
+            service = Service()
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+            self.service_pid = service.process.pid if service.process else None
+            
+            self.prepare_target(driver)
+            self.attach(driver)
+            
+            logger.info("Chrome driver setup successfully")
+            return driver
+            
+        except WebDriverException as e:
+            logger.error(f"Failed to setup Chrome driver: {e}")
+            raise
+    
+    @staticmethod
+    def build_options(page_load_strategy: Optional[str] = None) -> Options:
+        """
+        Chrome options shared by single-tab drivers and multi-tab browsers
+        """
         chrome_options = Options()
         
         # Rotate user agents
@@ -53,7 +99,11 @@ class SeleniumManager:
         # Performance options
         chrome_options.add_argument("--disable-extensions")
         chrome_options.add_argument("--disable-plugins")
-        chrome_options.add_argument("--disable-images")
+        
+        # Блокировка картинок, шрифтов, медиа и трекеров (см. BLOCKING_PROFILE)
+        content_prefs = get_content_settings_prefs(settings.BLOCKING_PROFILE)
+        if content_prefs:
+            chrome_options.add_experimental_option("prefs", content_prefs)
         # ВАЖНО: НЕ отключаем JavaScript!
         # chrome_options.add_argument("--disable-javascript")  # Закомментировано!
         
@@ -64,41 +114,58 @@ class SeleniumManager:
         # Window size
         chrome_options.add_argument("--window-size=1920,1080")
         
-        try:
-            # Используем selenium-manager для автоматического управления драйверами
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
-            
-            service = Service()
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # Apply stealth
-            stealth(driver,
-                   languages=["en-US", "en"],
-                   vendor="Google Inc.",
-                   platform="Win32",
-                   webgl_vendor="Intel Inc.",
-                   renderer="Intel Iris OpenGL Engine",
-                   fix_hairline=True,
-                )
-            
-            # Set timeouts
-            driver.implicitly_wait(settings.IMPLICIT_WAIT)
-            driver.set_page_load_timeout(settings.PAGE_LOAD_TIMEOUT)
-            
-            # Execute script to hide automation
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            self.driver = driver
-            self.wait = WebDriverWait(driver, settings.IMPLICIT_WAIT)
-            
-            logger.info("Chrome driver setup successfully")
-            return driver
-            
-        except WebDriverException as e:
-            logger.error(f"Failed to setup Chrome driver: {e}")
-            raise
+        # Network events for CDP response capture
+        if settings.CDP_CAPTURE_ENABLED:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        
+        if page_load_strategy:
+            chrome_options.page_load_strategy = page_load_strategy
+        
+        return chrome_options
     
+    @staticmethod
+    def prepare_target(driver: webdriver.Chrome):
+        """
+        Stealth, timeouts and request blocking for the current window.
+        CDP commands apply per target, so every new tab needs this too
+        """
+        # Apply stealth
+        stealth(driver,
+               languages=["en-US", "en"],
+               vendor="Google Inc.",
+               platform="Win32",
+               webgl_vendor="Intel Inc.",
+               renderer="Intel Iris OpenGL Engine",
+               fix_hairline=True,
+            )
+        
+        # Set timeouts
+        driver.implicitly_wait(settings.IMPLICIT_WAIT)
+        driver.set_page_load_timeout(settings.PAGE_LOAD_TIMEOUT)
+        
+        # Execute script to hide automation
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        
+        blocked_patterns = get_blocked_url_patterns(settings.BLOCKING_PROFILE)
+        if settings.CDP_CAPTURE_ENABLED or blocked_patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+        if blocked_patterns:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_patterns})
+            logger.info(f"Blocking profile '{settings.BLOCKING_PROFILE}': {len(blocked_patterns)} URL patterns")
+    
+    def attach(self, driver):
+        """
+        Start using a prepared driver (or a tab of a shared browser)
+        """
+        self.driver = driver
+        self.wait = WebDriverWait(driver, settings.IMPLICIT_WAIT)
+        if settings.CDP_CAPTURE_ENABLED:
+            self.capture = NetworkCapture(driver)
+        
+        # Подхватываем сессию, которая уже прошла анти-бот проверку
+        self.sync_session()
+    
+    @stage_timer("navigate")
     def navigate_to_url(self, url: str) -> bool:
         """
         Navigate to URL with error handling
@@ -107,30 +174,59 @@ class SeleniumManager:
             logger.error("Driver not initialized")
             return False
         
+        self.sync_session()
+        
+        pacer = get_pacer()
+        with stage_timer("pacing_wait"):
+            pacer.wait_before_request(url)
+        
+        self.captured_json = None
+        self.reset_snapshot(url)
+        if self.capture:
+            self.capture.reset()
+        
         try:
             logger.info(f"Navigating to: {url}")
+            self.pages_loaded += 1
             self.driver.get(url)
             
             # Имитация поведения человека
-            import random
-            time.sleep(random.uniform(2.0, 5.0))
+            with stage_timer("dwell"):
+                pacer.dwell()
             
             # Имитация скроллинга
-            try:
-                scroll_height = self.driver.execute_script("return document.body.scrollHeight")
-                for i in range(1, 5):
-                    self.driver.execute_script(f"window.scrollTo(0, {scroll_height * i / 5});")
-                    time.sleep(random.uniform(0.3, 0.7))
-                self.driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(random.uniform(0.5, 1.0))
-            except Exception as e:
-                logger.debug(f"Error during scrolling: {e}")
+            if pacer.simulate_scroll:
+                try:
+                    scroll_height = self.driver.execute_script("return document.body.scrollHeight")
+                    for i in range(1, 5):
+                        self.driver.execute_script(f"window.scrollTo(0, {scroll_height * i / 5});")
+                        pacer.scroll_pause()
+                    self.driver.execute_script("window.scrollTo(0, 0);")
+                    pacer.settle_pause()
+                except Exception as e:
+                    logger.debug(f"Error during scrolling: {e}")
             
             # Check if we got blocked
             if self.is_blocked():
                 logger.warning("Detected anti-bot protection")
+                pacer.record_block(url)
+                BLOCKS.labels("browser").inc()
+                if self.session_store and self.session_version:
+                    self.session_store.invalidate(self.session_version, "driver got challenge page")
                 return False
             
+            pacer.record_success(url)
+            
+            # Страница товара могла сама запросить composer-api - забираем ответ без ожидания
+            if self.capture:
+                captured = self.capture.collect()
+                if captured and '"widgetStates"' in captured:
+                    self.captured_json = captured
+                self.log_transfer(url)
+            
+            if self.session_store and self.session_store.needs_refresh():
+                self.export_session()
+            
             return True
             
         except TimeoutException:
@@ -138,6 +234,83 @@ class SeleniumManager:
             return False
         except WebDriverException as e:
             logger.error(f"WebDriver error: {e}")
+            self.failed = True
+            return False
+    
+    def sync_session(self):
+        """
+        Load the newest shared session into this driver if it has not been applied yet
+        """
+        if not self.driver or not self.session_store:
+            return
+        
+        session = self.session_store.current()
+        if session and session.version != self.session_version:
+            self.apply_session(session)
+    
+    def apply_session(self, session: BrowserSession):
+        """
+        Import cookies and user agent of a shared session via CDP
+        """
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": session.user_agent})
+            
+            for cookie in session.cookies:
+                params = {
+                    "name": cookie["name"],
+                    "value": cookie["value"],
+                    "domain": cookie.get("domain"),
+                    "path": cookie.get("path", "/"),
+                    "secure": cookie.get("secure", False),
+                    "httpOnly": cookie.get("httpOnly", False)
+                }
+                if cookie.get("expiry"):
+                    params["expires"] = cookie["expiry"]
+                if cookie.get("sameSite"):
+                    params["sameSite"] = cookie["sameSite"]
+                self.driver.execute_cdp_cmd("Network.setCookie", params)
+            
+            self.session_version = session.version
+            logger.info(f"Applied shared session v{session.version} ({len(session.cookies)} cookies)")
+            
+        except WebDriverException as e:
+            logger.warning(f"Failed to apply shared session: {e}")
+    
+    def export_session(self) -> Optional[BrowserSession]:
+        """
+        Publish cookies and user agent of this driver to the shared store
+        """
+        if not self.driver or not self.session_store:
+            return None
+        
+        try:
+            cookies = self.driver.get_cookies()
+            user_agent = self.driver.execute_script("return navigator.userAgent")
+        except WebDriverException as e:
+            logger.warning(f"Failed to export session: {e}")
+            return None
+        
+        if not cookies:
+            return None
+        
+        session = self.session_store.publish(cookies, user_agent)
+        self.session_version = session.version
+        return session
+    
+    def is_healthy(self) -> bool:
+        """
+        Check that the driver session is still alive and usable
+        """
+        if not self.driver or self.failed:
+            return False
+        
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except WebDriverException as e:
+            logger.warning(f"Driver health check failed: {e}")
+            self.failed = True
             return False
     
     def is_blocked(self) -> bool:
@@ -148,78 +321,96 @@ class SeleniumManager:
             return True
             
         try:
-            # Common anti-bot indicators
-            blocked_indicators = [
-                "cloudflare",
-                "checking your browser",
-                "enable javascript",
-                "access denied",
-                "blocked"
-            ]
-            
-            page_source = self.driver.page_source.lower()
-            
-            for indicator in blocked_indicators:
-                if indicator in page_source:
-                    return True
-                    
-            return False
-            
+            return self.page_snapshot().is_blocked()
         except Exception:
             return True
     
+    @stage_timer("load_json")
+    def load_json(self, url: str, timeout: int = 30) -> Optional[str]:
+        """
+        Open a JSON endpoint and return its body, without human imitation or page scraping
+        """
+        if not self.driver:
+            logger.error("Driver not initialized")
+            return None
+        
+        self.sync_session()
+        
+        pacer = get_pacer()
+        with stage_timer("pacing_wait"):
+            pacer.wait_before_request(url)
+        
+        self.reset_snapshot(url)
+        if self.capture:
+            self.capture.reset()
+        
+        try:
+            logger.info(f"Loading JSON from: {url}")
+            self.pages_loaded += 1
+            self.driver.get(url)
+        except TimeoutException:
+            logger.error(f"Timeout while loading: {url}")
+            return None
+        except WebDriverException as e:
+            logger.error(f"WebDriver error: {e}")
+            self.failed = True
+            return None
+        
+        json_content = self.wait_for_json_response(timeout)
+        if self.capture:
+            self.log_transfer(url)
+        
+        if json_content:
+            pacer.record_success(url)
+            return json_content
+        
+        if self.is_blocked():
+            logger.warning("Detected anti-bot protection")
+            pacer.record_block(url)
+            BLOCKS.labels("browser").inc()
+            if self.session_store and self.session_version:
+                self.session_store.invalidate(self.session_version, "driver got challenge page")
+        
+        return None
+    
+    def log_transfer(self, url: str):
+        """
+        Report bytes transferred and requests blocked during the last navigation
+        """
+        transferred = self.capture.transferred_bytes
+        blocked = self.capture.blocked_requests
+        self.last_transferred_bytes = transferred
+        self.transferred_bytes_total += transferred
+        logger.info(f"Page transfer: {transferred / 1024:.1f} KB, {blocked} requests blocked ({url})")
+    
+    @stage_timer("wait_json")
     def wait_for_json_response(self, timeout: int = 30) -> Optional[str]:
         """
-        Wait for JSON response with improved logic
+        Wait for the composer-api response via CDP network events
         """
         if not self.driver:
             return None
             
         try:
-            logger.info("Waiting for JSON response...")
-            start_time = time.time()
-            
-            # Сначала ждем загрузки страницы
-            WebDriverWait(self.driver, 10).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            
-            # Теперь ждем появления JSON данных
-            while time.time() - start_time < timeout:
-                try:
-                    page_source = self.driver.page_source
-                    
-                    # Извлекаем JSON из HTML обертки
-                    json_content = self.extract_json_from_html(page_source)
-                    
-                    if json_content:
-                        try:
-                            # Проверяем, что JSON валидный
-                            data = json.loads(json_content)
-                            
-                            # Проверяем наличие widgetStates
-                            if 'widgetStates' in data:
-                                logger.info("JSON response with widgetStates found")
-                                return json_content
-                            
-                        except json.JSONDecodeError:
-                            # Это не валидный JSON, продолжаем ждать
-                            pass
-                    
-                    # Логируем первые несколько попыток для отладки
-                    if time.time() - start_time < 5:
-                        logger.debug(f"Page content preview: {page_source[:200]}...")
-                    
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    logger.debug(f"Error checking page source: {e}")
-                    time.sleep(0.5)
-                    continue
+            if self.capture:
+                logger.info("Waiting for JSON response event...")
+                json_content = self.capture.wait_for_response(is_data_url, timeout)
+                
+                if json_content and '"widgetStates"' in json_content:
+                    logger.info("JSON response with widgetStates captured")
+                    return json_content
+                
+                if json_content:
+                    logger.warning("Captured response does not contain widgetStates")
+                    return None
+                
+                logger.warning(f"No JSON response event after {timeout} seconds")
             
-            logger.warning(f"Timeout waiting for JSON response after {timeout} seconds")
-            # Возвращаем последний извлеченный JSON для отладки
-            return self.extract_json_from_html(self.driver.page_source)
+            # Без CDP (или если событие не пришло) разбираем загруженную страницу один раз
+            json_content = self.page_snapshot().json_content
+            if json_content and '"widgetStates"' in json_content:
+                return json_content
+            return None
             
         except Exception as e:
             logger.error(f"Error waiting for JSON response: {e}")
@@ -229,83 +420,33 @@ class SeleniumManager:
         """
         Extract JSON from HTML wrapper (from <pre> tag)
         """
-        try:
-            # Ищем содержимое между <pre> тегами
-            import re
-            
-            # Паттерн для поиска JSON в <pre> теге
-            pre_pattern = r'<pre[^>]*>(.*?)</pre>'
-            pre_match = re.search(pre_pattern, html_content, re.DOTALL | re.IGNORECASE)
-            
-            if pre_match:
-                json_content = pre_match.group(1).strip()
-                logger.debug("Found JSON in <pre> tag")
-                return json_content
-            
-            # Если не нашли в <pre>, попробуем найти JSON напрямую
-            # Ищем первую открывающую скобку до последней закрывающей
-            first_brace = html_content.find('{')
-            last_brace = html_content.rfind('}')
-            
-            if first_brace != -1 and last_brace != -1 and first_brace < last_brace:
-                json_content = html_content[first_brace:last_brace + 1]
-                logger.debug("Found JSON by brace search")
-                return json_content
-            
-            logger.debug("No JSON found in HTML content")
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error extracting JSON from HTML: {e}")
-            return None
+        return extract_json_from_html(html_content)
+    
+    def reset_snapshot(self, url: str = ""):
+        """
+        Forget the snapshot of the previous page
+        """
+        self.snapshot = None
+        self.snapshot_url = url
+    
+    def page_snapshot(self) -> PageSnapshot:
+        """
+        Snapshot of the current page, page_source is read once per navigation.
+        Raises WebDriverException if the driver is gone
+        """
+        if self.snapshot is None:
+            self.snapshot = PageSnapshot.from_driver(self.driver, self.snapshot_url)
+        return self.snapshot
 
     def debug_page_content(self):
         """
-        Debug helper to see what's on the page
+        Debug helper to see what's on the page (only with debug logging enabled)
         """
-        if not self.driver:
+        if not self.driver or not logger.isEnabledFor(logging.DEBUG):
             return
             
         try:
-            content = self.driver.page_source
-            logger.info(f"Page content length: {len(content)}")
-            logger.info(f"Content starts with: {content[:200]}")
-            
-            # Проверяем наличие <pre> тега
-            if '<pre' in content.lower():
-                logger.info("Page contains <pre> tag")
-                
-                # Попробуем извлечь JSON
-                json_content = self.extract_json_from_html(content)
-                if json_content:
-                    logger.info(f"Extracted JSON length: {len(json_content)}")
-                    logger.info(f"JSON starts with: {json_content[:100]}")
-                    
-                    try:
-                        data = json.loads(json_content)
-                        if 'widgetStates' in data:
-                            logger.info("Extracted JSON contains widgetStates")
-                            widget_states = data['widgetStates']
-                            logger.info(f"WidgetStates keys count: {len(widget_states)}")
-                        else:
-                            logger.info("Extracted JSON does not contain widgetStates")
-                            logger.info(f"JSON keys: {list(data.keys())}")
-                    except json.JSONDecodeError as e:
-                        logger.info(f"Extracted content is not valid JSON: {e}")
-                else:
-                    logger.info("Could not extract JSON from <pre> tag")
-            
-            # Проверяем наличие JavaScript
-            if 'script' in content.lower():
-                logger.info("Page contains JavaScript")
-            
-            # Проверяем, есть ли уже JSON напрямую
-            stripped_content = content.strip()
-            if stripped_content.startswith('{'):
-                logger.info("Page contains direct JSON structure")
-            else:
-                logger.info("Page contains HTML wrapper")
-                
+            self.page_snapshot().log_debug()
         except Exception as e:
             logger.error(f"Error in debug: {e}")
     
@@ -314,6 +455,8 @@ class SeleniumManager:
         Close driver and cleanup
         """
         if self.driver:
+            # Запоминаем процессы до quit: если он не сработает, Chrome останется сиротой
+            processes = driver_processes(self.service_pid) or self.processes
             try:
                 self.driver.quit()
                 logger.info("Driver closed successfully")
@@ -321,4 +464,6 @@ class SeleniumManager:
                 logger.error(f"Error closing driver: {e}")
             finally:
                 self.driver = None
-                self.wait = None
\ No newline at end of file
+                self.wait = None
+                reap_processes(processes)
+                self.processes = []
\ No newline at end of file
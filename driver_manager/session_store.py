@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserSession:
+    def __init__(self, cookies: List[Dict], user_agent: str, version: int, expires_at: float):
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.version = version
+        self.created_at = time.time()
+        self.expires_at = expires_at
+
+    @property
+    def cookie_header(self) -> str:
+        return "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in self.cookies)
+
+    def is_expired(self, margin: float = 0) -> bool:
+        return time.time() + margin >= self.expires_at
+
+
+class SessionStore:
+    """
+    Shared anti-bot session (cookies + user agent) harvested from a browser
+    that passed the challenge, reused by other drivers and HTTP fetchers
+    """
+
+    def __init__(self, ttl: Optional[int] = None, refresh_margin: Optional[int] = None):
+        self.ttl = settings.SESSION_TTL if ttl is None else ttl
+        self.refresh_margin = settings.SESSION_REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        self._session: Optional[BrowserSession] = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def publish(self, cookies: List[Dict], user_agent: str) -> BrowserSession:
+        """
+        Store a fresh session exported from a browser
+        """
+        now = time.time()
+        expires_at = now + self.ttl
+        cookie_expiries = [cookie["expiry"] for cookie in cookies if cookie.get("expiry")]
+        future_expiries = [expiry for expiry in cookie_expiries if expiry > now]
+        if future_expiries:
+            expires_at = min(expires_at, min(future_expiries))
+
+        with self._lock:
+            self._version += 1
+            self._session = BrowserSession(cookies, user_agent, self._version, expires_at)
+            session = self._session
+
+        logger.info(f"Session v{session.version} published: {len(cookies)} cookies, valid for {expires_at - now:.0f}s")
+        return session
+
+    def current(self) -> Optional[BrowserSession]:
+        """
+        Current valid session, or None if there is none or it has expired
+        """
+        with self._lock:
+            session = self._session
+        if session and not session.is_expired():
+            return session
+        return None
+
+    def needs_refresh(self) -> bool:
+        """
+        True when there is no session or it expires within the refresh margin
+        """
+        with self._lock:
+            session = self._session
+        return session is None or session.is_expired(self.refresh_margin)
+
+    def invalidate(self, version: Optional[int] = None, reason: str = "blocked"):
+        """
+        Drop the session. With version given, only that session is dropped,
+        so a stale report cannot kill a newer session
+        """
+        with self._lock:
+            if not self._session:
+                return
+            if version is not None and self._session.version != version:
+                return
+            dropped = self._session.version
+            self._session = None
+
+        logger.warning(f"Session v{dropped} invalidated: {reason}")
@@ -2,9 +2,10 @@ import logging
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from routes.parser_routes import router as parser_router
 from config.settings import settings
+from utils.metrics import render_metrics
 import time
 
 
@@ -72,11 +73,26 @@ async def root():
     }
 
 
+# Prometheus metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Ozon Price Parser API...")
     logger.info(f"Settings: Headless={settings.HEADLESS}, Max articles={settings.MAX_ARTICLES_PER_REQUEST}")
+    
+    # Resume jobs left unfinished by a previous run
+    from routes.parser_routes import job_manager
+    job_manager.start()
+    
+    # Price history is loaded up front and lives independently of the parser
+    from parser.price_history import get_price_history
+    get_price_history()
 
 
 # Shutdown event
@@ -85,9 +101,12 @@ async def shutdown_event():
     logger.info("Shutting down Ozon Price Parser API...")
     
     # Clean up parser instance
-    from routes.parser_routes import parser_instance
+    from routes.parser_routes import parser_instance, job_manager
+    from parser.price_history import close_price_history
+    job_manager.cancel_all()
     if parser_instance:
         parser_instance.close()
+    close_price_history()
 
 
 if __name__ == "__main__":
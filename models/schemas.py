@@ -1,10 +1,16 @@
 from pydantic import BaseModel, Field, validator
+from datetime import datetime
 from typing import List, Optional
 from config.settings import settings
 
 
 class ArticlesRequest(BaseModel):
     articles: List[int] = Field(..., min_items=1, max_items=settings.MAX_ARTICLES_PER_REQUEST)
+    max_age: Optional[int] = Field(None, ge=0)
+    no_cache: bool = False
+    # Только артикулы, значения которых изменились (в этом запросе / после момента времени)
+    changes_only: bool = False
+    changed_since: Optional[datetime] = None
     
     @validator('articles')
     def validate_articles(cls, v):
@@ -30,6 +36,11 @@ class ArticleResult(BaseModel):
     seller: Optional[SellerInfo] = None
     price_info: Optional[PriceInfo] = None
     error: Optional[str] = None
+    cached: Optional[bool] = None
+    cache_age: Optional[float] = None
+    source_hash: Optional[str] = None
+    changed: Optional[bool] = None
+    changed_at: Optional[datetime] = None
 
 
 class ParseResponse(BaseModel):
@@ -37,4 +48,112 @@ class ParseResponse(BaseModel):
     total_articles: int
     parsed_articles: int
     results: List[ArticleResult]
-    errors: List[str] = []
\ No newline at end of file
+    errors: List[str] = []
+    unchanged_articles: Optional[int] = None
+    # Время ответа - следующее значение changed_since для клиента
+    as_of: Optional[datetime] = None
+
+
+class StreamResult(BaseModel):
+    type: str = "result"
+    index: int
+    result: ArticleResult
+
+
+class StreamSummary(BaseModel):
+    type: str = "summary"
+    success: bool
+    total_articles: int
+    parsed_articles: int
+    errors: List[str] = []
+    unchanged_articles: Optional[int] = None
+    as_of: Optional[datetime] = None
+
+
+class JobRequest(BaseModel):
+    articles: List[int] = Field(..., min_items=1, max_items=settings.JOB_MAX_ARTICLES)
+    max_age: Optional[int] = Field(None, ge=0)
+    no_cache: bool = False
+    
+    @validator('articles')
+    def validate_articles(cls, v):
+        if not v:
+            raise ValueError('Articles list cannot be empty')
+        return v
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    total_articles: int
+    completed_articles: int
+    parsed_articles: int
+    failed_articles: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    results: List[ArticleResult] = []
+
+
+class JobResultsPage(BaseModel):
+    job_id: str
+    status: str
+    offset: int
+    limit: int
+    completed_articles: int
+    next_offset: Optional[int] = None
+    results: List[ArticleResult]
+
+
+class PriceObservation(BaseModel):
+    timestamp: datetime
+    cardPrice: Optional[int] = None
+    price: Optional[int] = None
+    originalPrice: Optional[int] = None
+    isAvailable: Optional[bool] = None
+
+
+class ArticleHistory(BaseModel):
+    article: int
+    total_observations: int
+    observations: List[PriceObservation]
+
+
+class PriceStats(BaseModel):
+    min: int
+    max: int
+    avg: float
+
+
+class HistoryWindow(BaseModel):
+    days: int
+    observations: int
+    cardPrice: Optional[PriceStats] = None
+    price: Optional[PriceStats] = None
+    originalPrice: Optional[PriceStats] = None
+    # Доля наблюдений, в которых товар был в наличии
+    availability: Optional[float] = None
+
+
+class ArticleHistoryStats(BaseModel):
+    article: int
+    total_observations: int
+    first_seen: datetime
+    last_seen: datetime
+    last_change: datetime
+    windows: List[HistoryWindow]
+
+
+class HistoryStatsRequest(BaseModel):
+    articles: List[int] = Field(..., min_items=1, max_items=settings.HISTORY_MAX_ARTICLES)
+    days: List[int] = Field([7, 30], min_items=1, max_items=10)
+    
+    @validator('days')
+    def validate_days(cls, v):
+        if any(days < 1 for days in v):
+            raise ValueError('Window must be at least one day')
+        return v
+
+
+class HistoryStatsResponse(BaseModel):
+    results: List[ArticleHistoryStats]
+    missing_articles: List[int] = []
@@ -17,6 +17,13 @@ const CONFIG = {
   
   // Настройки API
   API_URL: 'http://<IP-ADRESS>:8000/api/v1/get_price',
+  JOBS_API_URL: 'http://<IP-ADRESS>:8000/api/v1/jobs',
+  USE_JOBS_API: false,      // Фоновые задачи вместо долгого синхронного запроса
+  JOB_POLL_INTERVAL: 5000,  // Интервал опроса статуса задачи (мс)
+  JOB_PAGE_SIZE: 500,       // Размер страницы при загрузке результатов
+  BULK_API_URL: 'http://<IP-ADRESS>:8000/api/v1/bulk',
+  USE_BULK_API: false,      // Весь лист одной фоновой задачей через bulk endpoint
+  BULK_BATCH_SIZE: 10000,   // Размер батча для bulk endpoint (BULK_MAX_ARTICLES на сервере)
   
   // Настройки запросов
   BATCH_SIZE: 50,           // Размер батча (максимум для Ozon API)
@@ -6,6 +6,8 @@
 class HttpService {
   constructor() {
     this.apiUrl = CONFIG.API_URL;
+    this.jobsApiUrl = CONFIG.JOBS_API_URL;
+    this.bulkApiUrl = CONFIG.BULK_API_URL;
   }
   
   /**
@@ -56,6 +58,79 @@ class HttpService {
     }
   }
   
+  /**
+   * Выполняет запрос через фоновую задачу: создание, опрос статуса, загрузка результатов.
+   * Возвращает ответ в том же формате, что и fetchOzonData
+   */
+  fetchOzonDataViaJob(articles) {
+    try {
+      Logger.log(`Создание задачи для ${articles.length} артикулов`);
+      
+      // Bulk endpoint принимает просто JSON массив артикулов
+      const job = CONFIG.USE_BULK_API
+        ? this.requestJson(`${this.bulkApiUrl}?mode=job`, {
+            method: 'POST',
+            headers: {
+              'Content-Type': 'application/json'
+            },
+            payload: JSON.stringify(articles)
+          })
+        : this.requestJson(this.jobsApiUrl, {
+            method: 'POST',
+            headers: {
+              'Content-Type': 'application/json'
+            },
+            payload: JSON.stringify({ articles: articles })
+          });
+      
+      let status = job;
+      while (status.status !== 'completed') {
+        Utilities.sleep(CONFIG.JOB_POLL_INTERVAL);
+        status = this.requestJson(`${this.jobsApiUrl}/${job.job_id}?include_results=false`, { method: 'GET' });
+        Logger.log(`Задача ${job.job_id}: ${status.completed_articles}/${status.total_articles}`);
+      }
+      
+      const results = [];
+      let offset = 0;
+      while (offset !== null && offset !== undefined) {
+        const page = this.requestJson(
+          `${this.jobsApiUrl}/${job.job_id}/results?offset=${offset}&limit=${CONFIG.JOB_PAGE_SIZE}`,
+          { method: 'GET' }
+        );
+        results.push(...page.results);
+        offset = page.results.length > 0 ? page.next_offset : null;
+      }
+      
+      return {
+        success: status.parsed_articles > 0,
+        total_articles: status.total_articles,
+        parsed_articles: status.parsed_articles,
+        results: results,
+        errors: results.filter(r => !r.success && r.error).map(r => r.error)
+      };
+      
+    } catch (error) {
+      Logger.log(`Ошибка фоновой задачи: ${error.message}`);
+      throw error;
+    }
+  }
+  
+  /**
+   * Выполняет HTTP запрос и разбирает JSON ответ
+   */
+  requestJson(url, options) {
+    options.muteHttpExceptions = true;
+    
+    const response = UrlFetchApp.fetch(url, options);
+    const responseCode = response.getResponseCode();
+    
+    if (responseCode < 200 || responseCode >= 300) {
+      throw new Error(`HTTP Error: ${responseCode} - ${response.getContentText()}`);
+    }
+    
+    return JSON.parse(response.getContentText());
+  }
+  
   /**
    * Тестирует подключение к API
    */
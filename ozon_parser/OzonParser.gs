@@ -26,8 +26,9 @@ class OzonParser {
       
       Logger.log(`Найдено ${articlesData.length} артикулов для обработки`);
       
-      // Разбиваем на батчи по 50 артикулов (максимум для Ozon API)
-      const batches = this.createBatches(articlesData, CONFIG.BATCH_SIZE);
+      // Разбиваем на батчи по 50 артикулов (максимум для Ozon API), для bulk endpoint - крупнее
+      const batchSize = CONFIG.USE_BULK_API ? CONFIG.BULK_BATCH_SIZE : CONFIG.BATCH_SIZE;
+      const batches = this.createBatches(articlesData, batchSize);
       Logger.log(`Создано ${batches.length} батчей`);
       
       // Обрабатываем каждый батч
@@ -91,7 +92,9 @@ class OzonParser {
       const articles = batch.map(item => item.article);
       
       // Делаем запрос к Ozon API
-      const apiResponse = this.httpService.fetchOzonData(articles);
+      const apiResponse = CONFIG.USE_JOBS_API || CONFIG.USE_BULK_API
+        ? this.httpService.fetchOzonDataViaJob(articles)
+        : this.httpService.fetchOzonData(articles);
       
       // Обрабатываем ответ
       const processedData = this.dataProcessor.processOzonResponse(apiResponse);
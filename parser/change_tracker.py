@@ -0,0 +1,195 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional, Tuple
+from models.schemas import ArticleResult
+from utils.helpers import content_hash
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class TrackedState(NamedTuple):
+    card_price: Optional[int]
+    price: Optional[int]
+    original_price: Optional[int]
+    is_available: Optional[bool]
+    source_hash: str
+    changed_at: float
+    checked_at: float
+
+
+def observed_values(result: ArticleResult) -> Tuple[Optional[int], Optional[int], Optional[int], Optional[bool]]:
+    """
+    (cardPrice, price, originalPrice, isAvailable) of a result
+    """
+    price_info = result.price_info
+    if price_info is None:
+        return None, None, None, result.isAvailable
+    return price_info.cardPrice, price_info.price, price_info.originalPrice, result.isAvailable
+
+
+def to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def is_reported(result: ArticleResult, changes_only: bool = False, changed_since: Optional[datetime] = None) -> bool:
+    """
+    Whether a result passes the change filters of a request
+    """
+    if not result.success:
+        # Ошибки приходят в списке errors, значения они не меняют
+        return not (changes_only or changed_since)
+    if changes_only and not result.changed:
+        return False
+    if changed_since is not None:
+        if changed_since.tzinfo is None:
+            changed_since = changed_since.replace(tzinfo=timezone.utc)
+        return result.changed_at is not None and result.changed_at > changed_since
+    return True
+
+
+class ChangeTracker:
+    """
+    Last known cardPrice / price / originalPrice / isAvailable per article
+    with the hash of the widget they came from, so responses can be
+    reduced to articles whose values changed. Optional SQLite tier keeps
+    the state across restarts.
+
+    shared=True is for several processes tracking into one file (external
+    workers): the memory tier is skipped and every comparison reads and
+    writes SQLite in one write transaction, so the file is the only authority
+    """
+
+    def __init__(self, max_size: Optional[int] = None, sqlite_path: Optional[str] = None, shared: bool = False):
+        self.max_size = settings.CHANGE_TRACKER_MAX_SIZE if max_size is None else max_size
+        sqlite_path = settings.CHANGE_TRACKER_PATH if sqlite_path is None else sqlite_path
+        if shared and not sqlite_path:
+            raise ValueError("A change tracker shared by several processes needs an SQLite path")
+        self.shared = shared
+
+        self._states: "OrderedDict[int, TrackedState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.changes = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS article_states ("
+                "article INTEGER PRIMARY KEY, card_price INTEGER, price INTEGER, original_price INTEGER, "
+                "is_available INTEGER, source_hash TEXT NOT NULL, changed_at REAL NOT NULL, checked_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Change tracker persisted to {sqlite_path}")
+
+    def observe(self, result: ArticleResult) -> ArticleResult:
+        """
+        Compare a freshly parsed result with the last known state and
+        return it annotated with changed / changed_at / source_hash
+        """
+        if not result.success:
+            return result
+
+        now = time.time()
+        values = observed_values(result)
+        # HTML-путь не дает виджета - хешируем сами значения
+        source_hash = result.source_hash or content_hash(repr(values))
+
+        with self._lock, self._transaction():
+            previous = self._get(result.article)
+            # Тот же виджет - те же значения; иначе сравниваем значения,
+            # чтобы служебные поля виджета не давали ложных изменений
+            if previous and (previous.source_hash == source_hash or previous[:4] == values):
+                changed = False
+                changed_at = previous.changed_at
+            else:
+                changed = True
+                changed_at = now
+                self.changes += 1
+            state = TrackedState(*values, source_hash=source_hash, changed_at=changed_at, checked_at=now)
+            self._store(result.article, state)
+
+        if changed and previous:
+            logger.info(f"Article {result.article} changed: {previous[:4]} -> {values}")
+        return result.model_copy(update={
+            "source_hash": source_hash,
+            "changed": changed,
+            "changed_at": to_datetime(changed_at)
+        })
+
+    def get(self, article: int) -> Optional[TrackedState]:
+        with self._lock:
+            return self._get(article)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._states),
+                "max_size": self.max_size,
+                "changes": self.changes,
+                "shared": self.shared
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE: сравнение и запись не перемежаются с другими процессами
+        if self._db and self.shared:
+            self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except Exception:
+            if self._db:
+                self._db.rollback()
+            raise
+        if self._db:
+            self._db.commit()
+
+    def _get(self, article: int) -> Optional[TrackedState]:
+        # Общий файл могли обновить другие процессы - память им не верим
+        state = None if self.shared else self._states.get(article)
+        if state is None and self._db:
+            row = self._db.execute(
+                "SELECT card_price, price, original_price, is_available, source_hash, changed_at, checked_at "
+                "FROM article_states WHERE article = ?",
+                (article,)
+            ).fetchone()
+            if row:
+                is_available = None if row[3] is None else bool(row[3])
+                state = TrackedState(row[0], row[1], row[2], is_available, *row[4:])
+                self._remember(article, state)
+        return state
+
+    def _store(self, article: int, state: TrackedState):
+        self._remember(article, state)
+        if self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO article_states "
+                "(article, card_price, price, original_price, is_available, source_hash, changed_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    article, state.card_price, state.price, state.original_price,
+                    None if state.is_available is None else int(state.is_available),
+                    state.source_hash, state.changed_at, state.checked_at
+                )
+            )
+
+    def _remember(self, article: int, state: TrackedState):
+        if self.shared:
+            return
+        self._states[article] = state
+        self._states.move_to_end(article)
+        while len(self._states) > self.max_size:
+            self._states.popitem(last=False)
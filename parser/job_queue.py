@@ -0,0 +1,351 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from models.schemas import ArticleResult
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Состояния артикула в очереди
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+# Виды задач: job - POST /jobs, request - синхронный /get_price через QueueParser
+JOB = "job"
+REQUEST = "request"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "job_id TEXT PRIMARY KEY, created_at REAL NOT NULL, finished_at REAL, "
+    "total INTEGER NOT NULL, max_age INTEGER, no_cache INTEGER NOT NULL DEFAULT 0, "
+    "kind TEXT NOT NULL DEFAULT 'job')",
+    "CREATE TABLE IF NOT EXISTS job_items ("
+    "job_id TEXT NOT NULL, position INTEGER NOT NULL, article INTEGER NOT NULL, "
+    "state TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+    "lease_owner TEXT, lease_expires REAL, completed_seq INTEGER, payload TEXT, "
+    "PRIMARY KEY (job_id, position))",
+    "CREATE INDEX IF NOT EXISTS job_items_state ON job_items (state, lease_expires)",
+    "CREATE INDEX IF NOT EXISTS job_items_completed ON job_items (job_id, completed_seq)"
+)
+
+
+class QueueItem(NamedTuple):
+    job_id: str
+    position: int
+    article: int
+    max_age: Optional[int]
+    no_cache: bool
+    attempts: int
+
+
+class JobQueue:
+    """
+    Durable queue of job articles in SQLite (WAL mode).
+
+    Every article of a job is a row with its state (pending / in_flight /
+    done / failed) and number of attempts. Workers claim pending rows under
+    a lease and check each result off as it completes; rows whose lease
+    expired because the worker died go back to pending. The file can be
+    shared by several processes.
+
+    Reads go through a separate connection: in WAL mode they see the last
+    committed state without waiting for a writer that holds BEGIN IMMEDIATE
+    """
+
+    def __init__(self, path: Optional[str] = None, lease_seconds: Optional[int] = None, max_attempts: Optional[int] = None):
+        self.path = path or settings.JOB_QUEUE_PATH
+        self.lease_seconds = settings.JOB_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+
+        # isolation_level=None: транзакции открываем сами через BEGIN IMMEDIATE
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        self._migrate()
+        self._lock = threading.Lock()
+
+        self._reader = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._read_lock = threading.Lock()
+        logger.info(f"Job queue persisted to {self.path}")
+
+    def create_job(
+        self,
+        job_id: str,
+        articles: List[int],
+        max_age: Optional[int] = None,
+        no_cache: bool = False,
+        kind: str = JOB
+    ):
+        with self._transaction():
+            self._db.execute(
+                "INSERT INTO jobs (job_id, created_at, total, max_age, no_cache, kind) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, time.time(), len(articles), max_age, int(no_cache), kind)
+            )
+            self._db.executemany(
+                "INSERT INTO job_items (job_id, position, article) VALUES (?, ?, ?)",
+                ((job_id, position, article) for position, article in enumerate(articles))
+            )
+
+    def claim(self, owner: str, limit: int) -> List[QueueItem]:
+        """
+        Lease up to limit pending articles, oldest jobs first
+        """
+        if limit <= 0:
+            return []
+
+        with self._transaction():
+            rows = self._db.execute(
+                "SELECT i.job_id, i.position, i.article, j.max_age, j.no_cache, i.attempts "
+                "FROM job_items i JOIN jobs j ON j.job_id = i.job_id "
+                "WHERE i.state = ? ORDER BY i.rowid LIMIT ?",
+                (PENDING, limit)
+            ).fetchall()
+            lease_expires = time.time() + self.lease_seconds
+            self._db.executemany(
+                "UPDATE job_items SET state = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ? "
+                "WHERE job_id = ? AND position = ?",
+                ((IN_FLIGHT, owner, lease_expires, row[0], row[1]) for row in rows)
+            )
+
+        return [
+            QueueItem(job_id, position, article, max_age, bool(no_cache), attempts + 1)
+            for job_id, position, article, max_age, no_cache, attempts in rows
+        ]
+
+    def renew(self, owner: str) -> int:
+        """
+        Extend the leases of everything the owner is working on
+        """
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE job_items SET lease_expires = ? WHERE state = ? AND lease_owner = ?",
+                (time.time() + self.lease_seconds, IN_FLIGHT, owner)
+            )
+        return cursor.rowcount
+
+    def complete(self, item: QueueItem, owner: str, result: ArticleResult) -> bool:
+        """
+        Check off a finished article. Returns False if the lease was lost meanwhile
+        """
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE job_items SET state = ?, lease_owner = NULL, lease_expires = NULL, payload = ?, "
+                "completed_seq = (SELECT COALESCE(MAX(completed_seq), 0) + 1 FROM job_items WHERE job_id = ?) "
+                "WHERE job_id = ? AND position = ? AND state = ? AND lease_owner = ?",
+                (
+                    DONE if result.success else FAILED, result.model_dump_json(), item.job_id,
+                    item.job_id, item.position, IN_FLIGHT, owner
+                )
+            )
+            if cursor.rowcount:
+                self._finish_jobs([item.job_id])
+        return bool(cursor.rowcount)
+
+    def release(self, owner: str) -> int:
+        """
+        Return the owner's in-flight articles to the queue without counting the attempt
+        """
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE job_items SET state = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, lease_expires = NULL "
+                "WHERE state = ? AND lease_owner = ?",
+                (PENDING, IN_FLIGHT, owner)
+            )
+        if cursor.rowcount:
+            logger.info(f"Released {cursor.rowcount} in-flight articles back to the job queue")
+        return cursor.rowcount
+
+    def requeue(self, item: QueueItem, owner: str) -> bool:
+        """
+        Return one article the owner gave up on (e.g. cancelled by a parser restart)
+        """
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE job_items SET state = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, lease_expires = NULL "
+                "WHERE job_id = ? AND position = ? AND state = ? AND lease_owner = ?",
+                (PENDING, item.job_id, item.position, IN_FLIGHT, owner)
+            )
+        return bool(cursor.rowcount)
+
+    def release_expired(self) -> int:
+        """
+        Requeue in-flight articles whose lease expired; articles that used up
+        their attempts are failed instead
+        """
+        now = time.time()
+        with self._transaction():
+            expired = self._db.execute(
+                "SELECT job_id, position, article, attempts FROM job_items WHERE state = ? AND lease_expires < ?",
+                (IN_FLIGHT, now)
+            ).fetchall()
+            if not expired:
+                return 0
+
+            exhausted = [row for row in expired if row[3] >= self.max_attempts]
+            self._db.execute(
+                "UPDATE job_items SET state = ?, lease_owner = NULL, lease_expires = NULL "
+                "WHERE state = ? AND lease_expires < ? AND attempts < ?",
+                (PENDING, IN_FLIGHT, now, self.max_attempts)
+            )
+            for job_id, position, article, attempts in exhausted:
+                result = ArticleResult(article=article, success=False, error=f"Gave up after {attempts} attempts")
+                self._db.execute(
+                    "UPDATE job_items SET state = ?, lease_owner = NULL, lease_expires = NULL, payload = ?, "
+                    "completed_seq = (SELECT COALESCE(MAX(completed_seq), 0) + 1 FROM job_items WHERE job_id = ?) "
+                    "WHERE job_id = ? AND position = ?",
+                    (FAILED, result.model_dump_json(), job_id, job_id, position)
+                )
+            self._finish_jobs({row[0] for row in exhausted})
+
+        logger.warning(f"Requeued {len(expired) - len(exhausted)} articles with expired leases, gave up on {len(exhausted)}")
+        return len(expired)
+
+    def job_info(self, job_id: str, kind: Optional[str] = None) -> Optional[dict]:
+        """
+        Job metadata and article counts by state; with kind set, jobs of
+        another kind are reported as missing
+        """
+        with self._read() as db:
+            job = db.execute(
+                "SELECT created_at, finished_at, total FROM jobs WHERE job_id = ? AND (? IS NULL OR kind = ?)",
+                (job_id, kind, kind)
+            ).fetchone()
+            if not job:
+                return None
+            counts = dict(db.execute(
+                "SELECT state, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY state",
+                (job_id,)
+            ).fetchall())
+
+        created_at, finished_at, total = job
+        return {
+            "job_id": job_id,
+            "created_at": created_at,
+            "finished_at": finished_at,
+            "total": total,
+            "counts": {state: counts.get(state, 0) for state in (PENDING, IN_FLIGHT, DONE, FAILED)}
+        }
+
+    def results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ArticleResult]:
+        """
+        Finished results in completion order
+        """
+        with self._read() as db:
+            rows = db.execute(
+                "SELECT payload FROM job_items WHERE job_id = ? AND completed_seq IS NOT NULL "
+                "ORDER BY completed_seq LIMIT ? OFFSET ?",
+                (job_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [ArticleResult.model_validate_json(row[0]) for row in rows]
+
+    def completed_since(self, job_id: str, after_seq: int) -> List[Tuple[int, int, ArticleResult]]:
+        """
+        (completed_seq, position, result) of articles finished after after_seq
+        """
+        with self._read() as db:
+            rows = db.execute(
+                "SELECT completed_seq, position, payload FROM job_items WHERE job_id = ? AND completed_seq > ? "
+                "ORDER BY completed_seq",
+                (job_id, after_seq)
+            ).fetchall()
+        return [(seq, position, ArticleResult.model_validate_json(payload)) for seq, position, payload in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._read() as db:
+            counts = dict(db.execute("SELECT state, COUNT(*) FROM job_items GROUP BY state").fetchall())
+            unfinished = dict(db.execute(
+                "SELECT kind, COUNT(*) FROM jobs WHERE finished_at IS NULL GROUP BY kind"
+            ).fetchall())
+        stats = {state: counts.get(state, 0) for state in (PENDING, IN_FLIGHT, DONE, FAILED)}
+        stats["unfinished_jobs"] = unfinished.get(JOB, 0)
+        stats["unfinished_requests"] = unfinished.get(REQUEST, 0)
+        return stats
+
+    def unfinished_job_count(self, kind: str = JOB) -> int:
+        with self._read() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE finished_at IS NULL AND kind = ?",
+                (kind,)
+            ).fetchone()[0]
+
+    def delete_finished(self, older_than: float) -> int:
+        """
+        Drop jobs that finished before the given timestamp
+        """
+        with self._transaction():
+            job_ids = [row[0] for row in self._db.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (older_than,)
+            ).fetchall()]
+            for job_id in job_ids:
+                self._db.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                self._db.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return len(job_ids)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        with self._read_lock:
+            self._reader.close()
+
+    def _migrate(self):
+        """
+        Add columns introduced after the queue file was created
+        """
+        # Под BEGIN IMMEDIATE, чтобы два процесса не добавили колонку одновременно
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)").fetchall()}
+            if "kind" not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT '{JOB}'")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _finish_jobs(self, job_ids: Iterable[str]):
+        """
+        Mark jobs without pending or in-flight articles as finished (inside a transaction)
+        """
+        for job_id in job_ids:
+            self._db.execute(
+                "UPDATE jobs SET finished_at = ? WHERE job_id = ? AND finished_at IS NULL AND NOT EXISTS ("
+                "SELECT 1 FROM job_items WHERE job_id = ? AND state IN (?, ?))",
+                (time.time(), job_id, job_id, PENDING, IN_FLIGHT)
+            )
+
+    @contextmanager
+    def _transaction(self):
+        """
+        BEGIN IMMEDIATE takes the write lock up front, so claims from
+        other processes sharing the file cannot interleave
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    @contextmanager
+    def _read(self):
+        """
+        Read transaction on the reader connection: one consistent snapshot,
+        never blocked by BEGIN IMMEDIATE of a writer
+        """
+        with self._read_lock:
+            self._reader.execute("BEGIN")
+            try:
+                yield self._reader
+            finally:
+                self._reader.execute("COMMIT")
@@ -0,0 +1,375 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from models.schemas import ArticleResult, JobStatus, JobResultsPage
+from parser.job_queue import DONE, FAILED, IN_FLIGHT, JOB, JobQueue, QueueItem
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobLimitError(Exception):
+    """
+    Raised when the job table is full of unfinished jobs
+    """
+
+
+class Job:
+    def __init__(self, articles: List[int]):
+        self.id = uuid.uuid4().hex
+        self.articles = articles
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.finished_monotonic: Optional[float] = None
+
+        # Результаты в порядке завершения - смещения для пагинации не сдвигаются
+        self.completed: List[ArticleResult] = []
+        self.parsed = 0
+        self.futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    @property
+    def status(self) -> str:
+        if self.finished_at:
+            return "completed"
+        if self.completed:
+            return "running"
+        return "queued"
+
+    def record(self, result: ArticleResult):
+        """
+        Store a finished article result
+        """
+        with self._lock:
+            self.completed.append(result)
+            if result.success:
+                self.parsed += 1
+            if len(self.completed) == len(self.articles):
+                self.finished_at = datetime.now()
+                self.finished_monotonic = time.monotonic()
+                logger.info(f"Job {self.id} completed: {self.parsed}/{len(self.articles)} parsed")
+
+    def to_status(self, include_results: bool = True) -> JobStatus:
+        with self._lock:
+            completed = list(self.completed)
+        return JobStatus(
+            job_id=self.id,
+            status=self.status,
+            total_articles=len(self.articles),
+            completed_articles=len(completed),
+            parsed_articles=self.parsed,
+            failed_articles=len(completed) - self.parsed,
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+            results=completed if include_results else []
+        )
+
+    def to_page(self, offset: int, limit: int) -> JobResultsPage:
+        with self._lock:
+            page = self.completed[offset:offset + limit]
+            completed = len(self.completed)
+        next_offset = offset + len(page)
+        return JobResultsPage(
+            job_id=self.id,
+            status=self.status,
+            offset=offset,
+            limit=limit,
+            completed_articles=completed,
+            next_offset=next_offset if next_offset < len(self.articles) else None,
+            results=page
+        )
+
+
+class JobManager:
+    """
+    In-memory registry of background parsing jobs with TTL eviction
+    """
+
+    def __init__(self, max_jobs: Optional[int] = None, ttl: Optional[int] = None):
+        self.max_jobs = settings.JOB_MAX_JOBS if max_jobs is None else max_jobs
+        self.ttl = settings.JOB_TTL if ttl is None else ttl
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Nothing to resume for in-memory jobs
+        """
+
+    def submit(self, parser, articles: List[int], max_age: Optional[int] = None, no_cache: bool = False) -> Job:
+        """
+        Create a job and schedule its articles on the parser workers
+        """
+        job = Job(articles)
+
+        with self._lock:
+            self._evict_locked()
+            if len(self._jobs) >= self.max_jobs:
+                raise JobLimitError(f"Too many active jobs (max {self.max_jobs})")
+            self._jobs[job.id] = job
+
+        job.futures = parser.submit_articles(articles, max_age, no_cache)
+        for article, future in zip(articles, job.futures):
+            future.add_done_callback(lambda f, a=article: job.record(self._future_result(f, a)))
+
+        logger.info(f"Job {job.id} submitted with {len(articles)} articles")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._evict_locked()
+            return self._jobs.get(job_id)
+
+    def cancel_all(self):
+        """
+        Cancel queued articles of all jobs (used on shutdown)
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            for future in job.futures:
+                future.cancel()
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_monotonic is not None and now - job.finished_monotonic > self.ttl
+        ]:
+            del self._jobs[job_id]
+
+        # Если места нет - выкидываем самые старые завершенные задачи
+        while len(self._jobs) >= self.max_jobs:
+            finished = next((job_id for job_id, job in self._jobs.items() if job.finished_at), None)
+            if finished is None:
+                break
+            del self._jobs[finished]
+
+    @staticmethod
+    def _future_result(future: Future, article: int) -> ArticleResult:
+        if future.cancelled():
+            return ArticleResult(article=article, success=False, error="Cancelled")
+        exc = future.exception()
+        if exc:
+            return ArticleResult(article=article, success=False, error=str(exc))
+        return future.result()
+
+
+class PersistentJob:
+    """
+    View of a job stored in the JobQueue
+    """
+
+    def __init__(self, queue: JobQueue, job_id: str):
+        self.queue = queue
+        self.id = job_id
+
+    def to_status(self, include_results: bool = True) -> JobStatus:
+        info = self.queue.job_info(self.id)
+        counts = info["counts"]
+        completed = counts[DONE] + counts[FAILED]
+        return JobStatus(
+            job_id=self.id,
+            status=self._status(info),
+            total_articles=info["total"],
+            completed_articles=completed,
+            parsed_articles=counts[DONE],
+            failed_articles=counts[FAILED],
+            created_at=datetime.fromtimestamp(info["created_at"]),
+            finished_at=datetime.fromtimestamp(info["finished_at"]) if info["finished_at"] else None,
+            results=self.queue.results(self.id) if include_results else []
+        )
+
+    def to_page(self, offset: int, limit: int) -> JobResultsPage:
+        info = self.queue.job_info(self.id)
+        counts = info["counts"]
+        page = self.queue.results(self.id, offset, limit)
+        next_offset = offset + len(page)
+        return JobResultsPage(
+            job_id=self.id,
+            status=self._status(info),
+            offset=offset,
+            limit=limit,
+            completed_articles=counts[DONE] + counts[FAILED],
+            next_offset=next_offset if next_offset < info["total"] else None,
+            results=page
+        )
+
+    @staticmethod
+    def _status(info: dict) -> str:
+        if info["finished_at"]:
+            return "completed"
+        counts = info["counts"]
+        if counts[DONE] or counts[FAILED] or counts[IN_FLIGHT]:
+            return "running"
+        return "queued"
+
+
+class PersistentJobManager:
+    """
+    Jobs backed by the durable JobQueue, so they survive a crash or restart.
+
+    A dispatcher thread leases up to `window` queued articles, feeds them to
+    the parser and checks each result off as it completes. Leases are renewed
+    while the process is alive; on startup articles left in flight by a dead
+    process go back to the queue
+    """
+
+    def __init__(
+        self,
+        get_parser: Callable,
+        path: Optional[str] = None,
+        max_jobs: Optional[int] = None,
+        ttl: Optional[int] = None,
+        window: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        dispatch: bool = True
+    ):
+        self.get_parser = get_parser
+        self.queue = JobQueue(path)
+        self.max_jobs = settings.JOB_MAX_JOBS if max_jobs is None else max_jobs
+        self.ttl = settings.JOB_TTL if ttl is None else ttl
+        self.window = settings.JOB_QUEUE_WINDOW if window is None else window
+        self.poll_interval = settings.JOB_QUEUE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # False: задачи только ставятся в очередь, разбирают их процессы worker.py
+        self.dispatch = dispatch
+
+        self._inflight: Dict[Tuple[str, int], Future] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """
+        Requeue articles abandoned by a previous process and start dispatching
+        """
+        if self._thread or not self.dispatch:
+            return
+        self.queue.release_expired()
+        self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Job dispatcher started as {self.owner}: {self.queue.stats()}")
+
+    def submit(self, parser, articles: List[int], max_age: Optional[int] = None, no_cache: bool = False) -> PersistentJob:
+        """
+        Store a job; the dispatcher picks its articles up (parser is taken
+        from get_parser, so resumed jobs use the current one)
+        """
+        self.queue.delete_finished(time.time() - self.ttl)
+        if self.queue.unfinished_job_count() >= self.max_jobs:
+            raise JobLimitError(f"Too many active jobs (max {self.max_jobs})")
+
+        job_id = uuid.uuid4().hex
+        self.queue.create_job(job_id, articles, max_age, no_cache)
+        self._wakeup.set()
+
+        logger.info(f"Job {job_id} queued with {len(articles)} articles")
+        return PersistentJob(self.queue, job_id)
+
+    def get(self, job_id: str) -> Optional[PersistentJob]:
+        # Задачи синхронных запросов QueueParser через /jobs не видны
+        if self.queue.job_info(job_id, kind=JOB) is None:
+            return None
+        return PersistentJob(self.queue, job_id)
+
+    def cancel_all(self):
+        """
+        Stop dispatching and hand unfinished articles back to the queue (used on shutdown)
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+
+        with self._lock:
+            futures = list(self._inflight.values())
+            self._inflight.clear()
+        for future in futures:
+            future.cancel()
+        self.queue.release(self.owner)
+
+    def _run(self):
+        maintenance_interval = max(self.queue.lease_seconds / 3, self.poll_interval)
+        last_maintenance = time.monotonic()
+
+        while not self._stopping.is_set():
+            try:
+                self._dispatch()
+                if time.monotonic() - last_maintenance >= maintenance_interval:
+                    self.queue.renew(self.owner)
+                    self.queue.release_expired()
+                    last_maintenance = time.monotonic()
+            except Exception as e:
+                logger.error(f"Job dispatcher error: {e}")
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _dispatch(self):
+        """
+        Lease queued articles up to the window and schedule them on the parser
+        """
+        with self._lock:
+            free = self.window - len(self._inflight)
+        items = self.queue.claim(self.owner, free)
+        if not items:
+            return
+
+        try:
+            parser = self.get_parser()
+        except Exception:
+            for item in items:
+                self.queue.requeue(item, self.owner)
+            raise
+
+        groups: Dict[Tuple[Optional[int], bool], List[QueueItem]] = defaultdict(list)
+        for item in items:
+            groups[(item.max_age, item.no_cache)].append(item)
+
+        for (max_age, no_cache), group in groups.items():
+            futures = parser.submit_articles([item.article for item in group], max_age, no_cache)
+            for item, future in zip(group, futures):
+                with self._lock:
+                    self._inflight[(item.job_id, item.position)] = future
+                future.add_done_callback(lambda f, item=item: self._on_done(item, f))
+
+    def _on_done(self, item: QueueItem, future: Future):
+        with self._lock:
+            self._inflight.pop((item.job_id, item.position), None)
+        # При остановке незавершенные артикулы возвращает release()
+        if self._stopping.is_set():
+            return
+
+        try:
+            if future.cancelled():
+                # Парсер перезапущен - артикул обработает следующий
+                self.queue.requeue(item, self.owner)
+            elif not self.queue.complete(item, self.owner, JobManager._future_result(future, item.article)):
+                logger.warning(f"Lease on article {item.article} of job {item.job_id} was lost, result dropped")
+        except Exception as e:
+            logger.error(f"Failed to record article {item.article} of job {item.job_id}: {e}")
+        self._wakeup.set()
+
+
+def create_job_manager(get_parser: Callable):
+    """
+    Durable job manager if JOB_QUEUE_PATH is set, in-memory otherwise.
+    In external worker mode the API only enqueues jobs
+    """
+    if settings.WORKER_MODE == "external":
+        if not settings.JOB_QUEUE_PATH:
+            raise ValueError("WORKER_MODE=external requires JOB_QUEUE_PATH")
+        return PersistentJobManager(get_parser, dispatch=False)
+    if settings.JOB_QUEUE_PATH:
+        return PersistentJobManager(get_parser)
+    return JobManager()
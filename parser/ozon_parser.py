@@ -1,20 +1,33 @@
 import json
 import logging
 import time
+import functools
+import threading
 import concurrent.futures
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from selenium.common.exceptions import WebDriverException
 from driver_manager.selenium_manager import SeleniumManager
+from driver_manager.driver_pool import DriverPool
+from driver_manager.memory_watchdog import MemoryWatchdog
+from driver_manager.browser_tabs import TabbedBrowserFactory
+from driver_manager.http_fetcher import OzonHttpFetcher
+from driver_manager.session_store import SessionStore
+from parser.scheduler import FairScheduler
+from parser.result_cache import ResultCache
+from parser.change_tracker import ChangeTracker
+from parser.price_history import ObservationInbox, get_price_history
 from models.schemas import ArticleResult, PriceInfo, SellerInfo
 from utils.helpers import (
     build_ozon_api_url, 
     build_ozon_api_url_fallback,
-    find_web_price_property, 
     find_product_title,
     find_seller_name,
-    parse_price_data,
-    is_valid_json_response,
-    extract_price_from_html
+    extract_price_from_string,
+    content_hash
 )
+from utils.widget_index import WidgetIndex
+from utils.metrics import ARTICLES, HTTP_FALLBACKS, RETRIES, observe_stage, stage_timer
 from config.settings import settings
 
 
@@ -22,106 +35,256 @@ logger = logging.getLogger(__name__)
 
 
 class OzonParser:
-    def __init__(self):
-        self.workers = []
+    def __init__(self, external_worker: bool = False):
+        self.session_store = SessionStore()
+        if settings.DRIVER_TABS_PER_BROWSER > 1:
+            # Слоты пула - вкладки, несколько на один Chrome
+            factory = TabbedBrowserFactory(session_store=self.session_store)
+        else:
+            factory = functools.partial(SeleniumManager, session_store=self.session_store)
+        self.pool = DriverPool(factory=factory)
+        self.watchdog = MemoryWatchdog(self.pool) if settings.MEMORY_WATCHDOG_ENABLED else None
+        self.scheduler = FairScheduler(min(settings.MAX_WORKERS, self.pool.max_size))
+        self.http_fetcher = OzonHttpFetcher(self.session_store) if settings.HTTP_FETCH_ENABLED else None
+        self.cache = ResultCache() if settings.CACHE_ENABLED else None
+        self.change_tracker = self._create_change_tracker(external_worker) if settings.CHANGE_TRACKING_ENABLED else None
+        # Процессы worker.py отдают наблюдения API-процессу, который пишет историю;
+        # без PRICE_HISTORY_PATH API историю не ведет и забирать их некому
+        if external_worker:
+            self.history = ObservationInbox() if settings.PRICE_HISTORY_ENABLED and settings.PRICE_HISTORY_PATH else None
+        else:
+            self.history = get_price_history()
+        # article -> future of the fetch that is currently running
+        self._inflight: Dict[int, concurrent.futures.Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._session_thread: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def _create_change_tracker(external_worker: bool) -> ChangeTracker:
+        if not external_worker:
+            return ChangeTracker()
+        # Процессы worker.py сравнивают с общим состоянием в SQLite (по умолчанию - в файле очереди)
+        return ChangeTracker(sqlite_path=settings.CHANGE_TRACKER_PATH or settings.JOB_QUEUE_PATH, shared=True)
     
     def initialize(self):
         """
-        Initialize parser - workers will be created on demand
+        Initialize parser, warm up the driver pool and start workers
         """
+        if self.http_fetcher:
+            self.http_fetcher.start()
+        self.pool.start()
+        self.scheduler.start()
+        if self.watchdog:
+            self.watchdog.start()
+        
+        self._session_thread = threading.Thread(target=self._keep_session_fresh, name="ozon-session-refresh", daemon=True)
+        self._session_thread.start()
+        
         logger.info("Ozon parser initialized successfully")
     
-    def parse_articles(self, articles: List[int]) -> List[ArticleResult]:
+    def refresh_session(self) -> bool:
+        """
+        Pass the anti-bot check with a pooled browser and publish its session
+        """
+        with self.pool.lease() as manager:
+            if not manager.navigate_to_url(settings.OZON_BASE_URL):
+                return False
+            return manager.export_session() is not None
+    
+    def _keep_session_fresh(self):
+        """
+        Refresh the shared session before it goes stale or after it was blocked
+        """
+        while not self._stop_event.wait(settings.SESSION_CHECK_INTERVAL):
+            if not self.session_store.needs_refresh():
+                continue
+            try:
+                logger.info("Refreshing shared browser session")
+                if not self.refresh_session():
+                    logger.warning("Session refresh did not pass anti-bot check")
+            except Exception as e:
+                logger.error(f"Session refresh failed: {e}")
+    
+    @contextmanager
+    def worker(self) -> Iterator["OzonWorker"]:
+        """
+        Check out a worker backed by a pooled driver
+        """
+        with self.pool.lease() as manager:
+            yield OzonWorker(manager)
+    
+    def parse_articles(self, articles: List[int], max_age: Optional[int] = None, no_cache: bool = False) -> List[ArticleResult]:
         """
         Parse multiple articles using parallel workers
         """
-        # Ограничиваем количество одновременных запросов
-        worker_groups = self._distribute_articles(articles)
-        
-        # Используем только одного воркера для снижения нагрузки
-        return self._parse_with_single_worker(articles)
+        return [future.result() for future in self.submit_articles(articles, max_age, no_cache)]
     
-    def _distribute_articles(self, articles: List[int]) -> List[List[int]]:
+    def submit_articles(self, articles: List[int], max_age: Optional[int] = None, no_cache: bool = False) -> List[concurrent.futures.Future]:
         """
-        Distribute articles across workers
+        Schedule articles on the shared workers, futures keep the input order.
+        Each unique article is fetched once: duplicates in the batch and
+        articles already being fetched by another request share one future.
+        Cached results are returned as already completed futures
         """
-        total = len(articles)
+        unique: Dict[int, concurrent.futures.Future] = {}
         
-        if total <= settings.MAX_ARTICLES_PER_WORKER:
-            return [articles]
+        for article in articles:
+            if article in unique:
+                continue
+            cached = None if no_cache or not self.cache else self.cache.get(article, max_age)
+            if cached:
+                result, age = cached
+                ARTICLES.labels("cached").inc()
+                future = concurrent.futures.Future()
+                # Из кеша - значит, нового наблюдения не было
+                future.set_result(result.model_copy(update={"cached": True, "cache_age": round(age, 1), "changed": False}))
+                unique[article] = future
+            else:
+                unique[article] = None
         
-        groups = []
-        for i in range(0, total, settings.MAX_ARTICLES_PER_WORKER):
-            group = articles[i:i + settings.MAX_ARTICLES_PER_WORKER]
-            groups.append(group)
-            if len(groups) >= settings.MAX_WORKERS:
-                break
+        missing = [article for article, future in unique.items() if future is None]
+        scheduled = []
         
-        return groups
+        with self._inflight_lock:
+            to_parse = []
+            for article in missing:
+                in_flight = self._inflight.get(article)
+                if in_flight:
+                    unique[article] = in_flight
+                else:
+                    to_parse.append(article)
+            
+            if to_parse:
+                submitted_at = time.perf_counter()
+                tasks = [functools.partial(self._parse_one, article, submitted_at) for article in to_parse]
+                for article, future in zip(to_parse, self.scheduler.submit(tasks)):
+                    self._inflight[article] = future
+                    unique[article] = future
+                    scheduled.append((article, future))
+        
+        # Колбэк может выполниться сразу, поэтому вешаем его вне блокировки
+        for article, future in scheduled:
+            future.add_done_callback(functools.partial(self._forget_inflight, article))
+        
+        if len(unique) < len(articles) or len(to_parse) < len(missing):
+            logger.info(
+                f"Coalesced {len(articles)} requested articles into "
+                f"{len(to_parse)} fetches ({len(missing) - len(to_parse)} already in flight)"
+            )
+        
+        return [unique[article] for article in articles]
     
-    def _parse_with_single_worker(self, articles: List[int]) -> List[ArticleResult]:
-        """
-        Parse with single worker
-        """
-        worker = OzonWorker()
-        try:
-            worker.initialize()
-            return worker.parse_articles(articles)
-        finally:
-            worker.close()
+    def _forget_inflight(self, article: int, future: concurrent.futures.Future):
+        with self._inflight_lock:
+            if self._inflight.get(article) is future:
+                del self._inflight[article]
     
-    def _parse_with_multiple_workers(self, worker_groups: List[List[int]], original_articles: List[int]) -> List[ArticleResult]:
+    def _parse_one(self, article: int, submitted_at: Optional[float] = None) -> ArticleResult:
         """
-        Parse using multiple workers in parallel
+        Parse one article and store the result in cache
         """
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(worker_groups)) as executor:
-            futures = []
-            
-            for group in worker_groups:
-                future = executor.submit(self._parse_worker_group, group)
-                futures.append(future)
-            
-            all_results = []
-            for future in concurrent.futures.as_completed(futures):
-                worker_results = future.result()
-                all_results.extend(worker_results)
+        started = time.perf_counter()
+        if submitted_at is not None:
+            observe_stage("queue_wait", started - submitted_at)
+        
+        result = self._fetch_one(article)
+        observe_stage("article", time.perf_counter() - started)
+        ARTICLES.labels("success" if result.success else "failure").inc()
         
-        return self._sort_results_by_original_order(all_results, original_articles)
+        if self.change_tracker:
+            result = self.change_tracker.observe(result)
+        if self.cache:
+            self.cache.put(result)
+        if self.history:
+            self.history.append(result)
+        return result.model_copy(update={"cached": False})
     
-    def _parse_worker_group(self, articles: List[int]) -> List[ArticleResult]:
+    def _fetch_one(self, article: int) -> ArticleResult:
         """
-        Parse articles with dedicated worker
+        Parse one article, via direct HTTP if possible, otherwise on a pooled worker
         """
-        worker = OzonWorker()
+        if self.http_fetcher:
+            result = self._parse_with_http(article)
+            if result:
+                return result
+        
         try:
-            worker.initialize()
-            return worker.parse_articles(articles)
-        finally:
-            worker.close()
+            with self.worker() as worker:
+                return worker.parse_single_article(article)
+        except Exception as e:
+            logger.error(f"Unexpected error parsing article {article}: {e}")
+            return ArticleResult(
+                article=article,
+                success=False,
+                error=str(e)
+            )
     
-    def _sort_results_by_original_order(self, results: List[ArticleResult], original_articles: List[int]) -> List[ArticleResult]:
+    def _parse_with_http(self, article: int) -> Optional[ArticleResult]:
         """
-        Sort results to match original article order
+        Fetch composer-api JSON without a browser.
+        Returns None when Selenium is needed (challenge page or network error)
         """
-        result_dict = {result.article: result for result in results}
-        return [result_dict[article] for article in original_articles if article in result_dict]
+        fetch_result = self.http_fetcher.fetch_product_json_blocking(article)
+        
+        if fetch_result.needs_browser:
+            logger.info(f"Falling back to browser for article {article}")
+            HTTP_FALLBACKS.inc()
+            return None
+        
+        if not fetch_result.ok:
+            # Несуществующий артикул и ошибки сервера браузер не исправит
+            return ArticleResult(
+                article=article,
+                success=False,
+                error=f"Ozon API returned {fetch_result.error}"
+            )
+        
+        result = OzonWorker.extract_price_info(fetch_result.content, article)
+        if result:
+            logger.info(f"Successfully parsed article {article} via HTTP")
+            return result
+        
+        return ArticleResult(
+            article=article,
+            success=False,
+            error="Failed to extract price info"
+        )
     
     def close(self):
         """
-        Close parser
+        Close parser and all pooled drivers
         """
+        self._stop_event.set()
+        if self.watchdog:
+            self.watchdog.stop()
+        self.scheduler.shutdown(wait=False)
+        if self.http_fetcher:
+            self.http_fetcher.close()
+        self.pool.close()
+        if self.cache:
+            self.cache.close()
+        if self.change_tracker:
+            self.change_tracker.close()
+        if isinstance(self.history, ObservationInbox):
+            self.history.close()
         logger.info("Parser closed successfully")
 
 
 class OzonWorker:
-    def __init__(self):
-        self.selenium_manager = SeleniumManager()
-        self.driver = None
+    def __init__(self, selenium_manager: Optional[SeleniumManager] = None):
+        # Воркер из пула получает уже запущенный драйвер и не владеет им
+        self.owns_driver = selenium_manager is None
+        self.selenium_manager = selenium_manager or SeleniumManager()
+        self.driver = self.selenium_manager.driver
     
     def initialize(self):
         """
         Initialize worker with driver setup
         """
+        if self.driver:
+            return
+        
         try:
             self.driver = self.selenium_manager.setup_driver()
             logger.info("Worker initialized successfully")
@@ -147,12 +310,7 @@ class OzonWorker:
         """
         Parse single article with retries
         """
-        # Добавляем случайную задержку между запросами
-        import random
-        delay = random.uniform(3.0, 8.0)
-        logger.info(f"Adding random delay of {delay:.2f} seconds before parsing article {article}")
-        time.sleep(delay)
-        
+        # Паузы между запросами задает общий pacer внутри navigate_to_url
         for attempt in range(settings.MAX_RETRIES):
             try:
                 logger.info(f"Parsing article {article}, attempt {attempt + 1}")
@@ -169,17 +327,16 @@ class OzonWorker:
                     logger.warning(f"Failed to navigate to URL for article {article}")
                     
                     # Попробуем получить дополнительную информацию для отладки
-                    if self.driver:
-                        current_url = self.driver.current_url
-                        page_title = self.driver.title
-                        logger.info(f"Current URL: {current_url}")
-                        logger.info(f"Page title: {page_title}")
+                    if self.driver and logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Current URL: {self.driver.current_url}")
+                        logger.debug(f"Page title: {self.driver.title}")
                         
                         # Сохраним часть исходного кода для анализа
-                        page_source = self.driver.page_source[:1000]
-                        logger.debug(f"Page source sample: {page_source}")
+                        snapshot = self.selenium_manager.page_snapshot()
+                        logger.debug(f"Page source sample: {snapshot.source[:1000]}")
                     
                     if attempt < settings.MAX_RETRIES - 1:
+                        RETRIES.labels("navigation").inc()
                         logger.info(f"Retrying navigation in {settings.RETRY_DELAY} seconds...")
                         time.sleep(settings.RETRY_DELAY)
                         continue
@@ -190,15 +347,23 @@ class OzonWorker:
                             error="Failed to navigate to URL"
                         )
                 
+                # Данные, перехваченные через CDP во время загрузки страницы
+                if self.selenium_manager.captured_json:
+                    result = self.extract_price_info(self.selenium_manager.captured_json, article)
+                    if result:
+                        logger.info(f"Successfully parsed article {article} from captured response")
+                        return result
+                
                 # Debug page content first
                 self.selenium_manager.debug_page_content()
                 
-                # Получаем HTML страницы
-                page_source = self.driver.page_source
+                # HTML страницы читается один раз и используется всеми проверками
+                snapshot = self.selenium_manager.page_snapshot()
                 
-                if not page_source:
+                if not snapshot.source:
                     logger.warning(f"No page content for article {article}")
                     if attempt < settings.MAX_RETRIES - 1:
+                        RETRIES.labels("no_content").inc()
                         logger.info(f"Retrying in {settings.RETRY_DELAY} seconds...")
                         time.sleep(settings.RETRY_DELAY)
                         continue
@@ -210,7 +375,7 @@ class OzonWorker:
                         )
                 
                 # Пробуем извлечь цену из HTML
-                price_info = extract_price_from_html(page_source)
+                price_info = snapshot.price_info
                 
                 if price_info:
                     # Создаем успешный результат
@@ -220,22 +385,16 @@ class OzonWorker:
                         isAvailable=True,
                         price_info=price_info
                     )
+                elif snapshot.widget_index:
+                    # Страница сама оказалась ответом API
+                    result = self.extract_price_info_from_index(snapshot.widget_index, article)
                 else:
                     # Если не удалось извлечь цену из HTML, пробуем API
                     logger.info(f"Trying API fallback for article {article}")
                     api_url = build_ozon_api_url_fallback(article)
-                    navigation_success = self.selenium_manager.navigate_to_url(api_url)
                     
-                    if not navigation_success:
-                        logger.warning(f"API fallback navigation failed for article {article}")
-                        return ArticleResult(
-                            article=article,
-                            success=False,
-                            error="Failed to navigate to API URL"
-                        )
-                    
-                    # Wait for JSON response
-                    json_content = self.selenium_manager.wait_for_json_response()
+                    # Ответ API забираем из сетевого события, без ожидания рендера
+                    json_content = self.selenium_manager.load_json(api_url)
                     
                     if not json_content:
                         logger.warning(f"No JSON response for article {article}")
@@ -254,6 +413,7 @@ class OzonWorker:
                 else:
                     logger.warning(f"Failed to extract price info for article {article}")
                     if attempt < settings.MAX_RETRIES - 1:
+                        RETRIES.labels("extraction").inc()
                         logger.info(f"Retrying price extraction in {settings.RETRY_DELAY} seconds...")
                         time.sleep(settings.RETRY_DELAY)
                         continue
@@ -266,7 +426,11 @@ class OzonWorker:
                 
             except Exception as e:
                 logger.error(f"Error parsing article {article}: {e}")
+                if isinstance(e, WebDriverException):
+                    # Драйвер будет пересоздан пулом при возврате
+                    self.selenium_manager.failed = True
                 if attempt < settings.MAX_RETRIES - 1:
+                    RETRIES.labels("error").inc()
                     logger.info(f"Retrying after error in {settings.RETRY_DELAY} seconds...")
                     time.sleep(settings.RETRY_DELAY)
                     continue
@@ -283,34 +447,45 @@ class OzonWorker:
             error="Max retries exceeded"
         )
     
-    def extract_price_info(self, json_content: str, article: int) -> Optional[ArticleResult]:
+    @staticmethod
+    @stage_timer("extract_json")
+    def extract_price_info(json_content: str, article: int) -> Optional[ArticleResult]:
         """
         Extract price information from JSON content and return ArticleResult
         """
         try:
             logger.info("Extracting price info from JSON content")
             
-            # Проверяем, что это валидный JSON
-            if not is_valid_json_response(json_content):
-                logger.warning("Invalid JSON content")
-                return None
-            
-            # Парсим JSON
-            data = json.loads(json_content)
-            
-            # Получаем widgetStates
-            widget_states = data.get('widgetStates', {})
+            # Один разбор JSON, виджеты декодируются лениво
+            widget_index = WidgetIndex.from_json(json_content)
             
-            if not widget_states:
+            if not widget_index:
                 logger.warning("No widgetStates found in JSON")
                 return None
             
-            logger.info(f"Found {len(widget_states)} widget states")
+            return OzonWorker.extract_price_info_from_index(widget_index, article)
             
-            # Ищем webPrice свойство
-            web_price_value = find_web_price_property(widget_states)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON decode error: {e}")
+            logger.debug(f"JSON content preview: {json_content[:500]}")
+            return None
+        except Exception as e:
+            logger.error(f"Error extracting price info: {e}")
+            return None
+    
+    @staticmethod
+    def extract_price_info_from_index(widget_index: WidgetIndex, article: int) -> Optional[ArticleResult]:
+        """
+        Build ArticleResult from indexed widgetStates
+        """
+        try:
+            logger.info(f"Found {len(widget_index)} widget states")
             
-            if not web_price_value:
+            # Ищем и декодируем webPrice свойство
+            price_json = widget_index.decoded('webPrice')
+            raw_price = widget_index.raw('webPrice')
+            
+            if not price_json:
                 logger.warning("No webPrice property found in widget states")
                 return None
             
@@ -318,18 +493,16 @@ class OzonWorker:
             
             # Парсим данные о цене
             try:
-                price_json = json.loads(web_price_value)
                 is_available = price_json.get('isAvailable', False)
                 card_price = price_json.get('cardPrice')
                 price = price_json.get('price')
                 original_price = price_json.get('originalPrice')
                 
-                from utils.helpers import extract_price_from_string
-                
                 # Создаем результат с новой структурой
                 result = ArticleResult(
                     article=article,
                     success=True,
+                    source_hash=content_hash(raw_price) if raw_price else None,
                     isAvailable=is_available,
                     price_info=PriceInfo(
                         cardPrice=extract_price_from_string(card_price),
@@ -344,13 +517,13 @@ class OzonWorker:
             if result:
                 
                 # Ищем название товара
-                title = find_product_title(widget_states)
+                title = find_product_title(widget_index)
                 if title:
                     result.title = title
                     logger.info(f"Found product title: {title[:50]}...")
                 
                 # Ищем название селлера
-                seller_name = find_seller_name(widget_states)
+                seller_name = find_seller_name(widget_index)
                 if seller_name:
                     result.seller = SellerInfo(name=seller_name)
                     logger.info(f"Found seller name: {seller_name}")
@@ -361,10 +534,6 @@ class OzonWorker:
                 logger.warning("Failed to parse price data from webPrice property")
                 return None
                 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            logger.debug(f"JSON content preview: {json_content[:500]}")
-            return None
         except Exception as e:
             logger.error(f"Error extracting price info: {e}")
             return None
@@ -373,6 +542,6 @@ class OzonWorker:
         """
         Close worker and cleanup resources
         """
-        if self.selenium_manager:
+        if self.selenium_manager and self.owns_driver:
             self.selenium_manager.close()
         logger.info("Worker closed successfully")
\ No newline at end of file
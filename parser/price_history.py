@@ -0,0 +1,590 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from models.schemas import (
+    ArticleHistory,
+    ArticleHistoryStats,
+    ArticleResult,
+    HistoryWindow,
+    PriceObservation,
+    PriceStats
+)
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Один процесс на каталог истории: второй писатель перемешал бы строки колонок
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Агрегаты считаются векторно на numpy (есть в requirements.txt); если его
+# нет в окружении - C-циклами стандартной библиотеки по тем же массивам
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Отсутствующая цена / доступность в колонке
+MISSING = -1
+
+# Колонка -> typecode массива; на диске каждая колонка - отдельный файл
+COLUMNS = {
+    "article": "q",
+    "timestamp": "d",
+    "card_price": "q",
+    "price": "q",
+    "original_price": "q",
+    "available": "b"
+}
+PRICE_COLUMNS = ("card_price", "price", "original_price")
+
+# Номера строк одного артикула (до 4 млрд наблюдений)
+ROW_TYPECODE = "I"
+
+DAY = 86400
+
+# Обрезка раз в сутки просрочки / 10% лишних строк, а не на каждой записи
+TRIM_AGE_SLACK = DAY
+TRIM_ROWS_SLACK = 0.1
+
+
+def _encode(value: Optional[int]) -> int:
+    return MISSING if value is None else int(value)
+
+
+def _decode(value: int) -> Optional[int]:
+    return None if value == MISSING else value
+
+
+def observation_row(result: ArticleResult, timestamp: Optional[float] = None) -> tuple:
+    """
+    (article, timestamp, cardPrice, price, originalPrice, isAvailable) in column encoding
+    """
+    price_info = result.price_info
+    return (
+        result.article,
+        time.time() if timestamp is None else timestamp,
+        _encode(price_info.cardPrice if price_info else None),
+        _encode(price_info.price if price_info else None),
+        _encode(price_info.originalPrice if price_info else None),
+        _encode(result.isAvailable)
+    )
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def _gather(column: array, rows: array):
+    """
+    Values of a column at the given rows as one vector
+    """
+    if np is not None:
+        # frombuffer не копирует колонку; индексирование дает копию, view сразу освобождается
+        return np.frombuffer(column, dtype=column.typecode)[np.frombuffer(rows, dtype=rows.typecode)]
+    if len(rows) == 1:
+        return (column[rows[0]],)
+    return itemgetter(*rows)(column)
+
+
+def _price_stats(values) -> Optional[PriceStats]:
+    if np is not None:
+        present = values[values != MISSING]
+        if not present.size:
+            return None
+        return PriceStats(
+            min=int(present.min()),
+            max=int(present.max()),
+            avg=round(float(present.mean()), 2)
+        )
+
+    count = len(values) - values.count(MISSING)
+    if not count:
+        return None
+    return PriceStats(
+        min=min(filter(MISSING.__ne__, values)),
+        max=max(values),
+        avg=round(sum(filter(MISSING.__ne__, values)) / count, 2)
+    )
+
+
+def _availability(values) -> Optional[float]:
+    """
+    Share of observations where the article was available
+    """
+    if np is not None:
+        known = values[values != MISSING]
+        return round(float(known.mean()), 4) if known.size else None
+
+    known = len(values) - values.count(MISSING)
+    return round(values.count(1) / known, 4) if known else None
+
+
+class PriceHistory:
+    """
+    Append-only price history in array-backed columns (article, timestamp,
+    cardPrice, price, originalPrice, isAvailable): about 41 bytes per
+    observation plus a 4-byte row index per article. Windowed aggregates
+    gather only the rows of one article and run over whole vectors.
+
+    With a path, every column is appended to its own binary file in that
+    directory and loaded back with array.fromfile on startup. Only the
+    process holding the directory lock writes; other processes follow the
+    files read-only and take over the lock when the writer goes away.
+
+    Memory holds only the last retention_days / max_rows of observations;
+    older rows are dropped in batches. The files keep everything, loading
+    starts from the first retained row
+    """
+
+    def __init__(self, path: Optional[str] = None, retention_days: Optional[int] = None, max_rows: Optional[int] = None):
+        self.path = settings.PRICE_HISTORY_PATH if path is None else path
+        self.retention_days = settings.PRICE_HISTORY_RETENTION_DAYS if retention_days is None else retention_days
+        self.max_rows = settings.PRICE_HISTORY_MAX_ROWS if max_rows is None else max_rows
+
+        self._columns: Dict[str, array] = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        # article -> номера строк по возрастанию времени
+        self._rows: Dict[int, array] = {}
+        # article -> (значения последнего наблюдения, время последнего изменения)
+        self._latest: Dict[int, Tuple[Tuple[int, int, int, int], float]] = {}
+        self._lock = threading.Lock()
+        # Строк файлов, выброшенных из памяти: строка i в памяти - строка _base + i в файле
+        self._base = 0
+        self._files = {}
+        self._lock_file = None
+
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            self._load()
+            if not self.try_own():
+                logger.info(f"Price history at {self.path} is written by another process, following it read-only")
+            logger.info(
+                f"Price history loaded from {self.path}: "
+                f"{len(self._columns['timestamp'])} observations of {len(self._rows)} articles"
+            )
+
+    @property
+    def writable(self) -> bool:
+        return not self.path or bool(self._files)
+
+    def append(self, result: ArticleResult, timestamp: Optional[float] = None):
+        """
+        Record the prices and availability of a successfully parsed article
+        """
+        if result.success:
+            self.append_rows([observation_row(result, timestamp)])
+
+    def append_rows(self, rows: Iterable[tuple]):
+        """
+        Append encoded observation rows (see observation_row)
+        """
+        with self._lock:
+            if not self.writable:
+                raise RuntimeError(f"Price history at {self.path} is written by another process")
+            timestamps = self._columns["timestamp"]
+            for row in rows:
+                # Время не убывает, иначе бинарный поиск по окнам не работает
+                if timestamps and row[1] < timestamps[-1]:
+                    row = (row[0], timestamps[-1]) + tuple(row[2:])
+                self._index(len(timestamps), row)
+                for (name, column), value in zip(self._columns.items(), row):
+                    column.append(value)
+                    if self._files:
+                        self._files[name].write(column[-1:].tobytes())
+            for file in self._files.values():
+                file.flush()
+            self._trim()
+
+    def try_own(self) -> bool:
+        """
+        Become the writing process if no other process holds the directory
+        """
+        with self._lock:
+            if self.writable:
+                return True
+            if not self._acquire():
+                return False
+
+            # Строки, дописанные прежним владельцем, и оборванная им запись
+            self._load()
+            for name, column in self._columns.items():
+                file = open(os.path.join(self.path, f"{name}.bin"), "ab")
+                file.truncate((self._base + len(column)) * column.itemsize)
+                self._files[name] = file
+            logger.info(f"This process now writes the price history at {self.path}")
+            return True
+
+    def observations(
+        self,
+        article: int,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> Optional[ArticleHistory]:
+        """
+        Observations of an article in time order, the most recent limit of them
+        """
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+        with self._lock:
+            self._follow()
+            rows = self._rows.get(article)
+            if rows is None:
+                return None
+            start = self._window_start(rows, since.timestamp() if since else None)
+            if limit is not None:
+                start = max(start, len(rows) - limit)
+            selected = rows[start:]
+            if not selected:
+                return ArticleHistory(article=article, total_observations=len(rows), observations=[])
+            timestamps, card_prices, prices, original_prices, available = (
+                _gather(self._columns[name], selected) for name in COLUMNS if name != "article"
+            )
+
+        observations = [
+            PriceObservation(
+                timestamp=_to_datetime(float(timestamp)),
+                cardPrice=_decode(int(card_price)),
+                price=_decode(int(price)),
+                originalPrice=_decode(int(original_price)),
+                isAvailable=None if is_available == MISSING else bool(is_available)
+            )
+            for timestamp, card_price, price, original_price, is_available
+            in zip(timestamps, card_prices, prices, original_prices, available)
+        ]
+        return ArticleHistory(article=article, total_observations=len(rows), observations=observations)
+
+    def summary(self, article: int, days: Sequence[int] = (7, 30), now: Optional[float] = None) -> Optional[ArticleHistoryStats]:
+        """
+        min / max / avg of every price and availability share over the last N days
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._follow()
+            rows = self._rows.get(article)
+            if rows is None:
+                return None
+            timestamps = self._columns["timestamp"]
+            first_seen, last_seen = timestamps[rows[0]], timestamps[rows[-1]]
+            last_change = self._latest[article][1]
+
+            windows = []
+            for window_days in days:
+                selected = rows[self._window_start(rows, now - window_days * DAY):]
+                window = HistoryWindow(days=window_days, observations=len(selected))
+                if selected:
+                    window.cardPrice, window.price, window.originalPrice = (
+                        _price_stats(_gather(self._columns[name], selected)) for name in PRICE_COLUMNS
+                    )
+                    window.availability = _availability(_gather(self._columns["available"], selected))
+                windows.append(window)
+
+        return ArticleHistoryStats(
+            article=article,
+            total_observations=len(rows),
+            first_seen=_to_datetime(first_seen),
+            last_seen=_to_datetime(last_seen),
+            last_change=_to_datetime(last_change),
+            windows=windows
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = len(self._columns["timestamp"])
+            return {
+                "observations": rows,
+                "articles": len(self._rows),
+                "bytes": sum(column.itemsize * len(column) for column in self._columns.values())
+                + rows * array(ROW_TYPECODE).itemsize,
+                "trimmed": self._base,
+                "persisted": bool(self.path),
+                "writable": self.writable,
+                "vectorized": "numpy" if np is not None else "array"
+            }
+
+    def close(self):
+        with self._lock:
+            for file in self._files.values():
+                file.close()
+            self._files = {}
+            if self._lock_file:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def _window_start(self, rows: array, since: Optional[float]) -> int:
+        if since is None:
+            return 0
+        return bisect_left(rows, since, key=self._columns["timestamp"].__getitem__)
+
+    def _index(self, row_number: int, row: tuple):
+        article, timestamp, values = row[0], row[1], row[2:]
+        rows = self._rows.get(article)
+        if rows is None:
+            rows = self._rows[article] = array(ROW_TYPECODE)
+        rows.append(row_number)
+
+        latest = self._latest.get(article)
+        if latest is None or latest[0] != values:
+            self._latest[article] = (values, timestamp)
+        else:
+            self._latest[article] = (values, latest[1])
+
+    def _expired_rows(self, slack: bool = True) -> int:
+        """
+        Number of oldest in-memory rows beyond the retention limits; with
+        slack 0 until the excess is worth a rebuild
+        """
+        timestamps = self._columns["timestamp"]
+        expired = 0
+        if self.retention_days and timestamps:
+            cutoff = time.time() - self.retention_days * DAY
+            if timestamps[0] < cutoff - (TRIM_AGE_SLACK if slack else 0):
+                expired = bisect_left(timestamps, cutoff)
+        if self.max_rows and len(timestamps) > self.max_rows * (1 + (TRIM_ROWS_SLACK if slack else 0)):
+            expired = max(expired, len(timestamps) - self.max_rows)
+        return expired
+
+    def _trim(self, slack: bool = True):
+        """
+        Drop expired rows from memory and rebuild the row index
+        """
+        expired = self._expired_rows(slack)
+        if not expired:
+            return
+
+        for name in COLUMNS:
+            self._columns[name] = self._columns[name][expired:]
+        self._base += expired
+        self._rows = {}
+        for row_number, article in enumerate(self._columns["article"]):
+            rows = self._rows.get(article)
+            if rows is None:
+                rows = self._rows[article] = array(ROW_TYPECODE)
+            rows.append(row_number)
+        # Время последнего изменения оставшихся артикулов сохраняется
+        self._latest = {article: latest for article, latest in self._latest.items() if article in self._rows}
+        logger.info(f"Dropped {expired} expired observations from the price history")
+
+    def _acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        if self._lock_file is None:
+            self._lock_file = open(os.path.join(self.path, "lock"), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _follow(self):
+        # Читатель подтягивает строки, дописанные владельцем с прошлого раза
+        if not self.writable:
+            self._load()
+
+    def _load(self):
+        """
+        Read rows appended to the column files beyond what is in memory.
+        Only rows complete in every column are taken
+        """
+        paths = {name: os.path.join(self.path, f"{name}.bin") for name in COLUMNS}
+        if not all(os.path.exists(column_path) for column_path in paths.values()):
+            return
+        if not self._columns["timestamp"] and not self._base:
+            self._base = self._first_retained_row(paths["timestamp"])
+
+        tails = {}
+        for name, column in self._columns.items():
+            with open(paths[name], "rb") as file:
+                file.seek((self._base + len(column)) * column.itemsize)
+                tails[name] = file.read()
+
+        new_rows = min(len(tails[name]) // column.itemsize for name, column in self._columns.items())
+        if not new_rows:
+            return
+
+        start = len(self._columns["timestamp"])
+        for name, column in self._columns.items():
+            column.frombytes(tails[name][:new_rows * column.itemsize])
+        columns = [self._columns[name][start:] for name in COLUMNS]
+        for row_number, row in enumerate(zip(*columns), start):
+            self._index(row_number, row)
+        self._trim()
+
+    def _first_retained_row(self, timestamps_path: str) -> int:
+        """
+        First file row within the retention limits, so that startup does
+        not load rows that would be dropped right away
+        """
+        timestamps = array(COLUMNS["timestamp"])
+        with open(timestamps_path, "rb") as file:
+            data = file.read()
+        timestamps.frombytes(data[:len(data) - len(data) % timestamps.itemsize])
+        first = 0
+        if self.retention_days:
+            first = bisect_left(timestamps, time.time() - self.retention_days * DAY)
+        if self.max_rows:
+            first = max(first, len(timestamps) - self.max_rows)
+        return first
+
+
+class ObservationInbox:
+    """
+    Observations of external worker processes waiting in the shared job queue
+    file until the API process that writes the price history ingests them
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.JOB_QUEUE_PATH
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS price_observations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, article INTEGER NOT NULL, observed_at REAL NOT NULL, "
+            "card_price INTEGER NOT NULL, price INTEGER NOT NULL, original_price INTEGER NOT NULL, "
+            "available INTEGER NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def append(self, result: ArticleResult):
+        if not result.success:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO price_observations "
+                "(article, observed_at, card_price, price, original_price, available) VALUES (?, ?, ?, ?, ?, ?)",
+                observation_row(result)
+            )
+            self._db.commit()
+
+    def take(self, limit: int) -> List[tuple]:
+        """
+        Oldest waiting observations as (id, *observation_row)
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, article, observed_at, card_price, price, original_price, available "
+                "FROM price_observations ORDER BY id LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def delete(self, up_to_id: int):
+        with self._lock:
+            self._db.execute("DELETE FROM price_observations WHERE id <= ?", (up_to_id,))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class HistoryIngest:
+    """
+    Moves worker observations from the inbox into the price history.
+    Only the process that writes the history ingests; the others keep
+    trying to take over in case it goes away
+    """
+
+    def __init__(self, history: PriceHistory, inbox: ObservationInbox, interval: Optional[float] = None, batch: int = 10000):
+        self.history = history
+        self.inbox = inbox
+        self.interval = settings.JOB_QUEUE_POLL_INTERVAL if interval is None else interval
+        self.batch = batch
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="price-history-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.inbox.close()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                while self.history.try_own() and self.ingest() == self.batch:
+                    pass
+            except Exception as e:
+                logger.error(f"Price history ingest failed: {e}")
+
+    def ingest(self) -> int:
+        rows = self.inbox.take(self.batch)
+        if not rows:
+            return 0
+        self.history.append_rows(row[1:] for row in rows)
+        # Падение между записью и удалением даст повтор этих строк, но не потерю
+        self.inbox.delete(rows[-1][0])
+        return len(rows)
+
+
+# Общая для процесса история: не зависит от жизненного цикла парсера
+_history: Optional[PriceHistory] = None
+_ingest: Optional[HistoryIngest] = None
+_history_lock = threading.Lock()
+# Настройки не позволяют вести историю: не пытаться заново на каждом запросе
+_history_disabled = False
+
+
+def get_price_history() -> Optional[PriceHistory]:
+    """
+    Process-wide price history store, None if it is off or cannot be kept.
+
+    Embedded mode: this process parses and must be the writer.
+    External mode: worker observations arrive through the queue file and
+    PRICE_HISTORY_PATH is required, so every API process serves the same
+    history. A misconfiguration disables the history with a warning
+    """
+    global _history, _ingest, _history_disabled
+    if not settings.PRICE_HISTORY_ENABLED:
+        return None
+    with _history_lock:
+        if _history is not None or _history_disabled:
+            return _history
+
+        if settings.WORKER_MODE == "external":
+            if not settings.PRICE_HISTORY_PATH:
+                logger.warning("Price history disabled: WORKER_MODE=external requires PRICE_HISTORY_PATH")
+                _history_disabled = True
+                return None
+            history = PriceHistory()
+            _ingest = HistoryIngest(history, ObservationInbox())
+            _ingest.start()
+        else:
+            history = PriceHistory()
+            if not history.writable:
+                history.close()
+                logger.warning(
+                    f"Price history disabled: {settings.PRICE_HISTORY_PATH} is written by another process; "
+                    f"give every embedded API process its own PRICE_HISTORY_PATH"
+                )
+                _history_disabled = True
+                return None
+        _history = history
+        return _history
+
+
+def close_price_history():
+    global _history, _ingest, _history_disabled
+    with _history_lock:
+        _history_disabled = False
+        if _ingest:
+            _ingest.stop()
+            _ingest = None
+        if _history:
+            _history.close()
+            _history = None
+
@@ -0,0 +1,139 @@
+import concurrent.futures
+import logging
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from models.schemas import ArticleResult
+from parser.job_queue import REQUEST, JobQueue
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueueParser:
+    """
+    API-side stand-in for OzonParser when scraping runs in separate worker
+    processes (WORKER_MODE=external).
+
+    submit_articles stores the articles as a job in the shared JobQueue and
+    returns futures that are resolved as the workers check results off.
+    The API process never launches Chrome
+    """
+
+    def __init__(self, path: Optional[str] = None, poll_interval: Optional[float] = None, timeout: Optional[int] = None):
+        self.queue = JobQueue(path)
+        self.poll_interval = settings.QUEUE_RESULT_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.timeout = settings.QUEUE_RESULT_TIMEOUT if timeout is None else timeout
+
+        # job_id -> (артикул, future) по позициям, последний прочитанный completed_seq и время отправки
+        self._futures: Dict[str, List[Tuple[int, concurrent.futures.Future]]] = {}
+        self._last_seq: Dict[str, int] = {}
+        self._submitted_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def initialize(self):
+        self._thread = threading.Thread(target=self._poll_results, name="queue-results", daemon=True)
+        self._thread.start()
+        logger.info(f"Parser in external worker mode, queue: {self.queue.path}")
+
+    def parse_articles(self, articles: List[int], max_age: Optional[int] = None, no_cache: bool = False) -> List[ArticleResult]:
+        return [future.result() for future in self.submit_articles(articles, max_age, no_cache)]
+
+    def submit_articles(self, articles: List[int], max_age: Optional[int] = None, no_cache: bool = False) -> List[concurrent.futures.Future]:
+        """
+        Enqueue articles for the worker processes, futures keep the input order
+        """
+        unique = list(dict.fromkeys(articles))
+        futures = {}
+        for article in unique:
+            future = concurrent.futures.Future()
+            # Отменить уже поставленный в очередь артикул нельзя
+            future.set_running_or_notify_cancel()
+            futures[article] = future
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._futures[job_id] = [(article, futures[article]) for article in unique]
+            self._last_seq[job_id] = 0
+            self._submitted_at[job_id] = time.monotonic()
+        try:
+            self.queue.create_job(job_id, unique, max_age, no_cache, kind=REQUEST)
+        except Exception:
+            self._forget(job_id)
+            raise
+
+        return [futures[article] for article in articles]
+
+    def stats(self) -> dict:
+        stats = self.queue.stats()
+        with self._lock:
+            stats["waiting_requests"] = len(self._futures)
+        return stats
+
+    def _poll_results(self):
+        last_cleanup = time.monotonic()
+        while not self._stop_event.wait(self.poll_interval):
+            with self._lock:
+                job_ids = list(self._futures)
+            for job_id in job_ids:
+                try:
+                    self._collect(job_id)
+                except Exception as e:
+                    logger.error(f"Failed to read results of job {job_id}: {e}")
+
+            # Завершенные задачи запросов больше не нужны
+            if time.monotonic() - last_cleanup > 60:
+                last_cleanup = time.monotonic()
+                try:
+                    self.queue.delete_finished(time.time() - settings.JOB_TTL)
+                except Exception as e:
+                    logger.error(f"Failed to clean up finished jobs: {e}")
+
+    def _collect(self, job_id: str):
+        with self._lock:
+            futures = self._futures.get(job_id)
+            last_seq = self._last_seq.get(job_id, 0)
+            submitted_at = self._submitted_at.get(job_id, 0.0)
+        if futures is None:
+            return
+
+        for seq, position, result in self.queue.completed_since(job_id, last_seq):
+            future = futures[position][1]
+            if not future.done():
+                future.set_result(result)
+            last_seq = seq
+
+        with self._lock:
+            self._last_seq[job_id] = last_seq
+
+        if time.monotonic() - submitted_at > self.timeout:
+            logger.warning(f"No worker finished job {job_id} within {self.timeout}s")
+            for article, future in futures:
+                if not future.done():
+                    future.set_result(ArticleResult(article=article, success=False, error="Timed out waiting for a worker"))
+
+        if all(future.done() for _, future in futures):
+            self._forget(job_id)
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._last_seq.pop(job_id, None)
+            self._submitted_at.pop(job_id, None)
+
+    def close(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        with self._lock:
+            futures = [future for job_futures in self._futures.values() for _, future in job_futures]
+            self._futures.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError("Parser closed"))
+        self.queue.close()
+        logger.info("Queue parser closed")
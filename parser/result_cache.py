@@ -0,0 +1,128 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from models.schemas import ArticleResult
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Служебные поля ответа, которые не храним в кеше
+RESPONSE_ONLY_FIELDS = {"cached", "cache_age", "changed"}
+
+
+class ResultCache:
+    """
+    TTL + LRU cache of article results with an optional SQLite tier
+    that survives restarts
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        failure_ttl: Optional[int] = None,
+        max_size: Optional[int] = None,
+        sqlite_path: Optional[str] = None
+    ):
+        self.ttl = settings.CACHE_TTL if ttl is None else ttl
+        self.failure_ttl = settings.CACHE_FAILURE_TTL if failure_ttl is None else failure_ttl
+        self.max_size = settings.CACHE_MAX_SIZE if max_size is None else max_size
+        sqlite_path = settings.CACHE_SQLITE_PATH if sqlite_path is None else sqlite_path
+
+        # article -> (stored_at, result)
+        self._entries: "OrderedDict[int, Tuple[float, ArticleResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS article_results ("
+                "article INTEGER PRIMARY KEY, success INTEGER NOT NULL, "
+                "stored_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Result cache persisted to {sqlite_path}")
+
+    def get(self, article: int, max_age: Optional[float] = None) -> Optional[Tuple[ArticleResult, float]]:
+        """
+        Cached result and its age in seconds, or None if missing or stale
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(article)
+            if entry is None and self._db:
+                entry = self._load(article)
+                if entry:
+                    self._store_memory(article, entry)
+
+            if entry and self._is_fresh(entry, now, max_age):
+                self._entries.move_to_end(article)
+                self.hits += 1
+                stored_at, result = entry
+                return result, now - stored_at
+
+            self.misses += 1
+            return None
+
+    def put(self, result: ArticleResult):
+        """
+        Store a freshly parsed result
+        """
+        clean = result.model_copy(update={field: None for field in RESPONSE_ONLY_FIELDS})
+        entry = (time.time(), clean)
+
+        with self._lock:
+            self._store_memory(result.article, entry)
+            if self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO article_results (article, success, stored_at, payload) VALUES (?, ?, ?, ?)",
+                    (result.article, int(result.success), entry[0], clean.model_dump_json(exclude=RESPONSE_ONLY_FIELDS))
+                )
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def _is_fresh(self, entry: Tuple[float, ArticleResult], now: float, max_age: Optional[float]) -> bool:
+        stored_at, result = entry
+        age = now - stored_at
+        ttl = self.ttl if result.success else self.failure_ttl
+        if age > ttl:
+            return False
+        return max_age is None or age <= max_age
+
+    def _store_memory(self, article: int, entry: Tuple[float, ArticleResult]):
+        self._entries[article] = entry
+        self._entries.move_to_end(article)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self, article: int) -> Optional[Tuple[float, ArticleResult]]:
+        row = self._db.execute(
+            "SELECT stored_at, payload FROM article_results WHERE article = ?",
+            (article,)
+        ).fetchone()
+        if not row:
+            return None
+        return row[0], ArticleResult.model_validate_json(row[1])
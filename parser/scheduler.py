@@ -0,0 +1,128 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    def __init__(self, tasks: List[Callable[[], Any]]):
+        self.pending: Deque[tuple] = deque((task, Future()) for task in tasks)
+        self.futures: List[Future] = [future for _, future in self.pending]
+
+
+class FairScheduler:
+    """
+    Bounded set of worker threads shared by all requests.
+
+    Each submitted batch gets its own queue and workers take tasks from the
+    batches in round-robin order, so a large batch cannot starve a small one.
+    """
+
+    def __init__(self, num_workers: int, name: str = "ozon-worker"):
+        self.num_workers = max(num_workers, 1)
+        self.name = name
+
+        self._batches: Deque[_Batch] = deque()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self._closed = False
+
+    def start(self):
+        """
+        Start worker threads
+        """
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+        logger.info(f"Scheduler started with {self.num_workers} workers")
+
+    def submit(self, tasks: List[Callable[[], Any]]) -> List[Future]:
+        """
+        Submit a batch of tasks, returns futures in the same order
+        """
+        batch = _Batch(tasks)
+        if not tasks:
+            return batch.futures
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            self._batches.append(batch)
+            self._cond.notify(len(tasks))
+
+        return batch.futures
+
+    def stats(self) -> dict:
+        """
+        Current queue depth and worker utilisation
+        """
+        with self._cond:
+            return {
+                "workers": self.num_workers,
+                "busy_workers": self._busy,
+                "active_batches": len(self._batches),
+                "queued_tasks": sum(len(batch.pending) for batch in self._batches)
+            }
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting work and cancel everything that has not started yet
+        """
+        with self._cond:
+            self._closed = True
+            batches = list(self._batches)
+            self._batches.clear()
+            self._cond.notify_all()
+
+        for batch in batches:
+            for _, future in batch.pending:
+                future.cancel()
+
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+        logger.info("Scheduler stopped")
+
+    def _next_task(self) -> Optional[tuple]:
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._batches:
+                    batch = self._batches.popleft()
+                    item = batch.pending.popleft()
+                    # Партия с оставшимися задачами встает в конец очереди
+                    if batch.pending:
+                        self._batches.append(batch)
+                    self._busy += 1
+                    return item
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            item = self._next_task()
+            if item is None:
+                return
+
+            task, future = item
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(task())
+                except BaseException as e:
+                    future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._busy -= 1
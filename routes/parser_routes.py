@@ -1,43 +1,243 @@
+import asyncio
 import logging
+import threading
 import time
-from fastapi import APIRouter, HTTPException, status
-from models.schemas import ArticlesRequest, ParseResponse, ArticleResult
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from models.schemas import (
+    ArticlesRequest,
+    ParseResponse,
+    JobRequest,
+    JobStatus,
+    JobResultsPage,
+    StreamResult,
+    StreamSummary,
+    ArticleHistory,
+    ArticleHistoryStats,
+    HistoryStatsRequest,
+    HistoryStatsResponse
+)
 from parser.ozon_parser import OzonParser
-from typing import List
+from parser.jobs import JobLimitError, PersistentJobManager, create_job_manager
+from parser.queue_client import QueueParser
+from parser.price_history import get_price_history
+from parser.change_tracker import is_reported
+from utils.rate_limiter import get_pacer
+from utils.metrics import register_parser_collector
+from utils.bulk_input import BulkInputError, BulkLimitError, get_input_format, read_articles
+from config.settings import settings
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Global parser instance (будет заменено на pool в будущем)
+# Global parser instance (владеет пулом драйверов)
 parser_instance = None
+parser_lock = threading.Lock()
+
+# Пул и очередь текущего парсера попадают в /metrics при каждом опросе
+register_parser_collector(lambda: parser_instance)
+
+# Streaming formats: query value -> media type
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
 
 
 def get_parser():
     """
-    Get or create parser instance
+    Get or create parser instance with a warm driver pool
+    (a queue client in external worker mode)
     """
     global parser_instance
-    if parser_instance is None:
-        parser_instance = OzonParser()
-        parser_instance.initialize()
+    with parser_lock:
+        if parser_instance is None:
+            parser = QueueParser() if settings.WORKER_MODE == "external" else OzonParser()
+            parser.initialize()
+            parser_instance = parser
     return parser_instance
 
 
+# Background jobs for large batches (durable if JOB_QUEUE_PATH is set)
+job_manager = create_job_manager(get_parser)
+
+
+def get_stream_format(http_request: Request, stream: Optional[str]) -> Optional[str]:
+    """
+    Streaming format requested by query parameter or Accept header
+    """
+    if stream:
+        if stream not in STREAM_MEDIA_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown stream format: {stream}. Use one of: {', '.join(STREAM_MEDIA_TYPES)}"
+            )
+        return stream
+    
+    accept = http_request.headers.get("accept", "")
+    for stream_format, media_type in STREAM_MEDIA_TYPES.items():
+        if media_type in accept:
+            return stream_format
+    return None
+
+
+def format_stream_record(record, stream_format: str) -> str:
+    """
+    Serialize one stream record as an NDJSON line or an SSE event
+    """
+    payload = record.model_dump_json()
+    if stream_format == "sse":
+        return f"event: {record.type}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def is_change_request(changes_only: bool, changed_since: Optional[datetime]) -> bool:
+    return changes_only or changed_since is not None
+
+
+async def stream_results(
+    articles: List[int],
+    futures: list,
+    stream_format: str,
+    changes_only: bool = False,
+    changed_since: Optional[datetime] = None
+) -> AsyncIterator[str]:
+    """
+    Emit each result as soon as it is parsed, then a summary record.
+    With change filters, unchanged articles are only counted in the summary
+    """
+    start_time = time.time()
+    as_of = datetime.now(timezone.utc)
+    parsed_articles = 0
+    unchanged_articles = 0
+    errors = []
+    
+    async def indexed(index, future):
+        return index, await asyncio.wrap_future(future)
+    
+    for next_result in asyncio.as_completed([indexed(i, f) for i, f in enumerate(futures)]):
+        index, result = await next_result
+        if result.success:
+            parsed_articles += 1
+        elif result.error:
+            errors.append(result.error)
+        if not is_reported(result, changes_only, changed_since):
+            unchanged_articles += result.success
+            continue
+        yield format_stream_record(StreamResult(index=index, result=result), stream_format)
+    
+    yield format_stream_record(
+        StreamSummary(
+            success=parsed_articles > 0,
+            total_articles=len(articles),
+            parsed_articles=parsed_articles,
+            errors=errors,
+            unchanged_articles=unchanged_articles if is_change_request(changes_only, changed_since) else None,
+            as_of=as_of
+        ),
+        stream_format
+    )
+    
+    total_time = time.time() - start_time
+    logger.info(f"Streaming completed in {total_time:.2f}s. Success: {parsed_articles}, Failed: {len(articles) - parsed_articles}")
+
+
+async def stream_bulk_results(
+    parser,
+    articles: List[int],
+    max_age: Optional[int],
+    no_cache: bool,
+    stream_format: str,
+    changes_only: bool = False,
+    changed_since: Optional[datetime] = None
+) -> AsyncIterator[str]:
+    """
+    Submit articles chunk by chunk with at most BULK_WINDOW in flight and
+    emit results as they complete. A slow client slows down submission,
+    a disconnected one stops it
+    """
+    start_time = time.time()
+    as_of = datetime.now(timezone.utc)
+    unchanged_articles = 0
+    chunk_size = max(settings.BULK_CHUNK_SIZE, 1)
+    window = max(settings.BULK_WINDOW, chunk_size)
+    parsed_articles = 0
+    errors = []
+    pending = set()
+    next_index = 0
+    
+    async def indexed(index, future):
+        return index, await asyncio.wrap_future(future)
+    
+    while pending or next_index < len(articles):
+        # Следующая порция уходит в планировщик, только когда в окне есть место
+        while next_index < len(articles) and len(pending) + chunk_size <= window:
+            chunk = articles[next_index:next_index + chunk_size]
+            futures = await run_in_threadpool(parser.submit_articles, chunk, max_age, no_cache)
+            pending.update(asyncio.ensure_future(indexed(next_index + i, future)) for i, future in enumerate(futures))
+            next_index += len(chunk)
+        
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            index, result = task.result()
+            if result.success:
+                parsed_articles += 1
+            elif result.error:
+                errors.append(result.error)
+            if not is_reported(result, changes_only, changed_since):
+                unchanged_articles += result.success
+                continue
+            yield format_stream_record(StreamResult(index=index, result=result), stream_format)
+    
+    yield format_stream_record(
+        StreamSummary(
+            success=parsed_articles > 0,
+            total_articles=len(articles),
+            parsed_articles=parsed_articles,
+            errors=errors,
+            unchanged_articles=unchanged_articles if is_change_request(changes_only, changed_since) else None,
+            as_of=as_of
+        ),
+        stream_format
+    )
+    
+    total_time = time.time() - start_time
+    logger.info(f"Bulk streaming completed in {total_time:.2f}s. Success: {parsed_articles}, Failed: {len(articles) - parsed_articles}")
+
+
 @router.post("/get_price", response_model=ParseResponse)
-async def get_price(request: ArticlesRequest):
+async def get_price(request: ArticlesRequest, http_request: Request, stream: Optional[str] = Query(None)):
     """
-    Parse prices for given articles
+    Parse prices for given articles.
+    With ?stream=ndjson|sse (or a matching Accept header) results are streamed as they are parsed.
+    changes_only / changed_since reduce the results to articles whose values changed
     """
+    stream_format = get_stream_format(http_request, stream)
+    
     try:
         start_time = time.time()
+        as_of = datetime.now(timezone.utc)
         logger.info(f"Received request to parse {len(request.articles)} articles")
         
-        # Get parser instance
-        parser = get_parser()
+        # Get parser instance (запуск драйверов не должен блокировать event loop)
+        parser = await run_in_threadpool(get_parser)
         
-        # Parse articles
-        results = parser.parse_articles(request.articles)
+        # Parse articles on the parser workers; in external mode submitting writes the
+        # shared SQLite queue and may wait for its lock, so it runs off the event loop too
+        futures = await run_in_threadpool(parser.submit_articles, request.articles, request.max_age, request.no_cache)
+        
+        if stream_format:
+            return StreamingResponse(
+                stream_results(request.articles, futures, stream_format, request.changes_only, request.changed_since),
+                media_type=STREAM_MEDIA_TYPES[stream_format]
+            )
+        
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        results = list(results)
         
         # Calculate timing
         end_time = time.time()
@@ -51,12 +251,20 @@ async def get_price(request: ArticlesRequest):
         # Collect errors
         errors = [r.error for r in failed_results if r.error]
         
+        # Режим изменений: в ответе только артикулы с новыми значениями
+        unchanged_articles = None
+        if is_change_request(request.changes_only, request.changed_since):
+            results = [r for r in results if is_reported(r, request.changes_only, request.changed_since)]
+            unchanged_articles = len(successful_results) - len(results)
+        
         response = ParseResponse(
             success=len(successful_results) > 0,
             total_articles=len(request.articles),
             parsed_articles=len(successful_results),
             results=results,
-            errors=errors
+            errors=errors,
+            unchanged_articles=unchanged_articles,
+            as_of=as_of
         )
         
         logger.info(f"Parsing completed in {total_time:.2f}s. Success: {len(successful_results)}, Failed: {len(failed_results)}. Average: {avg_time_per_article:.2f}s per article")
@@ -71,12 +279,188 @@ async def get_price(request: ArticlesRequest):
         )
 
 
+@router.post("/bulk")
+async def bulk_price(
+    http_request: Request,
+    mode: str = Query("stream", pattern="^(stream|job)$"),
+    stream: Optional[str] = Query(None),
+    max_age: Optional[int] = Query(None, ge=0),
+    no_cache: bool = False,
+    changes_only: bool = False,
+    changed_since: Optional[datetime] = Query(None)
+):
+    """
+    Parse up to BULK_MAX_ARTICLES articles sent as a JSON array, NDJSON or CSV body.
+    Duplicates are dropped; results are streamed (mode=stream, NDJSON by default)
+    or collected in a background job (mode=job). changes_only / changed_since
+    filter the stream to changed articles
+    """
+    stream_format = get_stream_format(http_request, stream) or "ndjson"
+    
+    try:
+        input_format = get_input_format(http_request.headers.get("content-type"))
+        articles = await read_articles(http_request.stream(), input_format, settings.BULK_MAX_ARTICLES)
+    except BulkLimitError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except BulkInputError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    logger.info(f"Received bulk request with {len(articles)} unique articles ({input_format})")
+    
+    # Задачи в памяти держат все результаты и ставят все артикулы в планировщик сразу;
+    # большие объемы - только через постоянную очередь, она выдает их окнами
+    if mode == "job" and not isinstance(job_manager, PersistentJobManager) and len(articles) > settings.JOB_MAX_ARTICLES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Bulk jobs over {settings.JOB_MAX_ARTICLES} articles need the durable job queue (JOB_QUEUE_PATH); use mode=stream"
+        )
+    
+    parser = await run_in_threadpool(get_parser)
+    
+    if mode == "job":
+        try:
+            job = await run_in_threadpool(job_manager.submit, parser, articles, max_age, no_cache)
+        except JobLimitError as e:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=job.to_status(include_results=False).model_dump(mode="json")
+        )
+    
+    return StreamingResponse(
+        stream_bulk_results(parser, articles, max_age, no_cache, stream_format, changes_only, changed_since),
+        media_type=STREAM_MEDIA_TYPES[stream_format]
+    )
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(request: JobRequest):
+    """
+    Submit articles for background parsing, returns job id immediately
+    """
+    parser = await run_in_threadpool(get_parser)
+    
+    try:
+        job = await run_in_threadpool(job_manager.submit, parser, request.articles, request.max_age, request.no_cache)
+    except JobLimitError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
+    
+    return await run_in_threadpool(job.to_status, include_results=False)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, include_results: bool = True):
+    """
+    Job progress with partial results
+    """
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return await run_in_threadpool(job.to_status, include_results=include_results)
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsPage)
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Page through completed job results in completion order
+    """
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return await run_in_threadpool(job.to_page, offset, limit)
+
+
+def get_history():
+    """
+    Price history store; reading it never starts the parser
+    """
+    history = get_price_history()
+    if not history:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Price history is disabled")
+    return history
+
+
+def summarize_history(history, articles: List[int], days: List[int]) -> HistoryStatsResponse:
+    """
+    Aggregates of every article in one pass, run in the threadpool
+    """
+    results = []
+    missing_articles = []
+    for article in dict.fromkeys(articles):
+        summary = history.summary(article, days)
+        if summary is None:
+            missing_articles.append(article)
+        else:
+            results.append(summary)
+    return HistoryStatsResponse(results=results, missing_articles=missing_articles)
+
+
+@router.get("/history/{article}", response_model=ArticleHistory)
+async def get_article_history(
+    article: int,
+    since: Optional[datetime] = Query(None),
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    """
+    Recorded prices and availability of an article, the most recent limit observations
+    """
+    history = await run_in_threadpool(get_history)
+    result = await run_in_threadpool(history.observations, article, since, limit)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No history for this article")
+    return result
+
+
+@router.get("/history/{article}/stats", response_model=ArticleHistoryStats)
+async def get_article_history_stats(article: int, days: List[int] = Query([7, 30])):
+    """
+    min / max / avg prices over the last N days (7 and 30 by default) and the last change time
+    """
+    if any(window < 1 for window in days):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Window must be at least one day")
+    history = await run_in_threadpool(get_history)
+    result = await run_in_threadpool(history.summary, article, days)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No history for this article")
+    return result
+
+
+@router.post("/history/stats", response_model=HistoryStatsResponse)
+async def get_history_stats(request: HistoryStatsRequest):
+    """
+    History aggregates for many articles at once
+    """
+    history = await run_in_threadpool(get_history)
+    return await run_in_threadpool(summarize_history, history, request.articles, request.days)
+
+
 @router.get("/health")
 async def health_check():
     """
     Health check endpoint
     """
-    return {"status": "ok", "message": "Ozon parser API is running"}
+    response = {"status": "ok", "message": "Ozon parser API is running"}
+    history = await run_in_threadpool(get_price_history)
+    if history:
+        response["price_history"] = await run_in_threadpool(history.stats)
+    if isinstance(parser_instance, QueueParser):
+        response["job_queue"] = parser_instance.stats()
+    elif parser_instance:
+        response["driver_pool"] = parser_instance.pool.stats()
+        response["scheduler"] = parser_instance.scheduler.stats()
+        if parser_instance.cache:
+            response["cache"] = parser_instance.cache.stats()
+        if parser_instance.change_tracker:
+            response["change_tracker"] = parser_instance.change_tracker.stats()
+        response["pacing"] = get_pacer().stats()
+    return response
 
 
 @router.post("/restart_parser")
@@ -86,13 +470,15 @@ async def restart_parser():
     """
     global parser_instance
     try:
-        if parser_instance:
-            parser_instance.close()
-        parser_instance = None
+        with parser_lock:
+            old_parser = parser_instance
+            parser_instance = None
+        
+        if old_parser:
+            await run_in_threadpool(old_parser.close)
         
         # Initialize new parser
-        parser_instance = OzonParser()
-        parser_instance.initialize()
+        await run_in_threadpool(get_parser)
         
         return {"status": "success", "message": "Parser restarted successfully"}
         
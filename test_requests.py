@@ -104,6 +104,36 @@ def test_multiple_articles():
         print(f"✗ Multiple articles test failed: {e}\n")
 
 
+def test_streaming():
+    """Test streaming NDJSON mode"""
+    print("🔍 Testing streaming mode...")
+    
+    payload = {
+        "articles": [2360879218, 859220077, 1774818716]
+    }
+    
+    try:
+        start_time = time.time()
+        response = requests.post(f"{BASE_URL}/api/v1/get_price?stream=ndjson", json=payload, stream=True)
+        print(f"Status: {response.status_code}")
+        
+        for line in response.iter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            elapsed = time.time() - start_time
+            if record['type'] == 'result':
+                result = record['result']
+                print(f"  [{elapsed:.2f}s] #{record['index']} {result['article']} - {'✓' if result['success'] else '✗'}")
+            else:
+                print(f"  [{elapsed:.2f}s] Summary: {record['parsed_articles']}/{record['total_articles']}")
+        
+        print("✓ Streaming test completed\n")
+        
+    except Exception as e:
+        print(f"✗ Streaming test failed: {e}\n")
+
+
 def test_invalid_request():
     """Test invalid request handling"""
     print("🔍 Testing invalid request handling...")
@@ -156,6 +186,7 @@ def main():
     test_health()
     test_single_article()
     test_multiple_articles()
+    test_streaming()
     test_invalid_request()
     test_restart_parser()
     
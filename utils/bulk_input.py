@@ -0,0 +1,180 @@
+import codecs
+import csv
+import json
+import logging
+from typing import AsyncIterator, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Content-Type -> input format
+BULK_INPUT_FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+    "text/plain": "csv"
+}
+
+
+class BulkInputError(ValueError):
+    """
+    Raised for malformed bulk input
+    """
+
+
+class BulkLimitError(BulkInputError):
+    """
+    Raised when the input has more unique articles than allowed
+    """
+
+
+def get_input_format(content_type: Optional[str]) -> str:
+    """
+    Input format for a request Content-Type (JSON array by default)
+    """
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if not media_type:
+        return "json"
+    if media_type not in BULK_INPUT_FORMATS:
+        raise BulkInputError(f"Unsupported content type: {media_type}. Use one of: {', '.join(BULK_INPUT_FORMATS)}")
+    return BULK_INPUT_FORMATS[media_type]
+
+
+def parse_article(value: str) -> int:
+    try:
+        article = int(value)
+    except ValueError:
+        raise BulkInputError(f"Invalid article: {value[:50]!r}")
+    if article <= 0:
+        raise BulkInputError(f"Invalid article: {article}")
+    return article
+
+
+class JsonArrayReader:
+    """
+    Incremental reader of a JSON array of integers: [123, 456, ...]
+    """
+
+    def __init__(self):
+        # Что допустимо дальше: open "[", first - число или "]",
+        # value - число, separator - "," или "]", end - только пробелы
+        self._expect = "open"
+        self._number = ""
+
+    def feed(self, text: str) -> Iterator[int]:
+        for char in text:
+            if char.isdigit():
+                if self._expect not in ("first", "value"):
+                    raise self._error(char)
+                self._number += char
+                continue
+
+            if self._number:
+                yield parse_article(self._number)
+                self._number = ""
+                self._expect = "separator"
+
+            if char.isspace():
+                continue
+            if char == "[" and self._expect == "open":
+                self._expect = "first"
+            elif char == "," and self._expect == "separator":
+                self._expect = "value"
+            elif char == "]" and self._expect in ("first", "separator"):
+                self._expect = "end"
+            else:
+                raise self._error(char)
+
+    def close(self) -> Iterator[int]:
+        if self._expect != "end":
+            raise BulkInputError("Malformed JSON array: not closed")
+        return iter(())
+
+    @staticmethod
+    def _error(char: str) -> BulkInputError:
+        return BulkInputError(f"Malformed JSON array: unexpected character {char!r}")
+
+
+class LineReader:
+    """
+    Incremental reader of NDJSON (number or {"article": ...} per line)
+    or CSV (article in the first column, optional header)
+    """
+
+    def __init__(self, input_format: str):
+        self.input_format = input_format
+        self._buffer = ""
+        self._line_number = 0
+        self._header_checked = False
+
+    def feed(self, text: str) -> Iterator[int]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            article = self._parse_line(line)
+            if article is not None:
+                yield article
+
+    def close(self) -> Iterator[int]:
+        line, self._buffer = self._buffer, ""
+        article = self._parse_line(line)
+        if article is not None:
+            yield article
+
+    def _parse_line(self, line: str) -> Optional[int]:
+        self._line_number += 1
+        line = line.strip()
+        if not line:
+            return None
+
+        if self.input_format == "ndjson":
+            if line.startswith("{"):
+                try:
+                    value = json.loads(line).get("article")
+                except (json.JSONDecodeError, AttributeError):
+                    raise BulkInputError(f"Invalid JSON on line {self._line_number}")
+                if not isinstance(value, (int, str)):
+                    raise BulkInputError(f"No article on line {self._line_number}")
+                return parse_article(str(value))
+            return parse_article(line)
+
+        cell = next(csv.reader([line]), [""])[0].strip()
+        # Заголовок CSV (например "article") пропускаем
+        if not self._header_checked:
+            self._header_checked = True
+            if not cell.isdigit():
+                return None
+        return parse_article(cell)
+
+
+async def read_articles(chunks: AsyncIterator[bytes], input_format: str, max_articles: int) -> List[int]:
+    """
+    Parse a request body chunk by chunk into unique articles in input order.
+    The raw body is never held in memory as a whole
+    """
+    reader = JsonArrayReader() if input_format == "json" else LineReader(input_format)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    seen = set()
+    articles = []
+
+    def add(parsed: Iterator[int]):
+        for article in parsed:
+            if article in seen:
+                continue
+            if len(articles) >= max_articles:
+                raise BulkLimitError(f"Too many articles (max {max_articles})")
+            seen.add(article)
+            articles.append(article)
+
+    try:
+        async for chunk in chunks:
+            add(reader.feed(decoder.decode(chunk)))
+        add(reader.feed(decoder.decode(b"", final=True)))
+    except UnicodeDecodeError:
+        raise BulkInputError("Request body is not valid UTF-8")
+    add(reader.close())
+
+    if not articles:
+        raise BulkInputError("No articles in request body")
+    return articles
@@ -1,12 +1,36 @@
+import hashlib
 import json
 import re
 import logging
-from typing import Optional, Dict, Any
-from models.schemas import PriceInfo, SellerInfo
+from typing import Optional, Dict, Any, Union
+from models.schemas import PriceInfo
+from config.settings import settings
+from utils.widget_index import WidgetIndex
+from utils.metrics import stage_timer
 
 
 logger = logging.getLogger(__name__)
 
+# Common anti-bot indicators
+BLOCKED_INDICATORS = [
+    "cloudflare",
+    "checking your browser",
+    "enable javascript",
+    "access denied",
+    "blocked"
+]
+
+# <span> с ценой в рублях; литеральный префикс позволяет быстро пропускать текст
+_PRICE_SPAN_RE = re.compile(
+    r'<span(?: class="(?P<css_class>[^"]{0,512})")?[^>]{0,512}>'
+    r'\s{0,16}(?P<value>[0-9][0-9\s]{0,32})₽\s{0,16}</span>'
+)
+CARD_PRICE_LABEL = 'с Ozon Картой'
+
+# JSON, который Chrome показывает для API-ответа, обёрнут в <pre>
+_PRE_OPEN_RE = re.compile(r'<pre[^>]{0,512}>', re.IGNORECASE)
+_PRE_CLOSE_RE = re.compile(r'</pre>', re.IGNORECASE)
+
 
 def extract_price_from_string(price_str: str) -> Optional[int]:
     """
@@ -42,44 +66,39 @@ def parse_price_data(price_json_str: str) -> Optional[PriceInfo]:
         return None
 
 
-def find_web_price_property(widget_states: Dict[str, Any]) -> Optional[str]:
+def as_widget_index(widget_states: Union[Dict[str, Any], WidgetIndex]) -> WidgetIndex:
+    """
+    Wrap raw widgetStates into a WidgetIndex (no-op for an existing index)
+    """
+    if isinstance(widget_states, WidgetIndex):
+        return widget_states
+    return WidgetIndex(widget_states)
+
+
+def find_web_price_property(widget_states: Union[Dict[str, Any], WidgetIndex]) -> Optional[str]:
     """
     Find webPrice property in widgetStates
     """
-    for key, value in widget_states.items():
-        if key.startswith('webPrice-') and isinstance(value, str):
-            return value
-    return None
+    return as_widget_index(widget_states).raw('webPrice')
 
 
-def find_product_title(widget_states: Dict[str, Any]) -> Optional[str]:
+def find_product_title(widget_states: Union[Dict[str, Any], WidgetIndex]) -> Optional[str]:
     """
     Find product title in webProductHeading property
     """
-    for key, value in widget_states.items():
-        if key.startswith('webProductHeading-') and isinstance(value, str):
-            try:
-                heading_data = json.loads(value)
-                return heading_data.get('title')
-            except (json.JSONDecodeError, KeyError):
-                continue
-    return None
+    heading_data = as_widget_index(widget_states).decoded('webProductHeading')
+    return heading_data.get('title') if heading_data else None
 
 
-def find_seller_name(widget_states: Dict[str, Any]) -> Optional[str]:
+def find_seller_name(widget_states: Union[Dict[str, Any], WidgetIndex]) -> Optional[str]:
     """
     Find seller name in webStickyProducts property
     """
-    for key, value in widget_states.items():
-        if key.startswith('webStickyProducts-') and isinstance(value, str):
-            try:
-                # Replace HTML entities before parsing
-                cleaned_value = value.replace('&quot;', '"')
-                sticky_data = json.loads(cleaned_value)
-                if 'seller' in sticky_data and 'name' in sticky_data['seller']:
-                    return sticky_data['seller']['name']
-            except (json.JSONDecodeError, KeyError):
-                continue
+    # HTML entities are replaced before parsing
+    for sticky_data in as_widget_index(widget_states).iter_decoded('webStickyProducts', unescape_quotes=True):
+        seller = sticky_data.get('seller')
+        if isinstance(seller, dict) and 'name' in seller:
+            return seller['name']
     return None
 
 
@@ -88,7 +107,7 @@ def build_ozon_api_url(article: int) -> str:
     Build Ozon API URL for article
     """
     # Изменено: используем обычную страницу товара вместо API
-    url = f"https://www.ozon.ru/product/{article}/"
+    url = f"{settings.OZON_BASE_URL}/product/{article}/"
     
     logger.info(f"Built URL for article {article}: {url}")
     return url
@@ -98,7 +117,7 @@ def build_ozon_api_url_fallback(article: int) -> str:
     """
     Build Ozon API URL for article (fallback to API if needed)
     """
-    base_url = "https://www.ozon.ru/api/composer-api.bx/page/json/v2"
+    base_url = settings.OZON_API_URL
     
     params = {
         "url": f"/product/{article}/"
@@ -122,27 +141,57 @@ def is_valid_json_response(response_text: str) -> bool:
         return False
 
 
+def is_challenge_page(content: str) -> bool:
+    """
+    Check if response body is an anti-bot challenge instead of product data
+    """
+    if not content:
+        return True
+    
+    # Валидный JSON ответ не считаем заглушкой, даже если в тексте есть "blocked"
+    if content.lstrip().startswith('{'):
+        return False
+    
+    lowered = content.lower()
+    return any(indicator in lowered for indicator in BLOCKED_INDICATORS)
+
+
+@stage_timer("extract_html")
 def extract_price_from_html(html_content: str) -> Optional[PriceInfo]:
     """
-    Extract price information from HTML content
+    Extract price information from HTML content.
+
+    Price spans are found in one pass of a precompiled pattern with
+    bounded quantifiers, so the time is linear in the page size
     """
     try:
-        # Регулярное выражение для поиска цены
-        price_pattern = r'<span class="[^"]*?\s*tsBody[^"]*?"[^>]*?>\s*([0-9\s]+)\s*₽\s*</span>'
-        price_match = re.search(price_pattern, html_content)
-        
-        # Регулярное выражение для поиска старой цены
-        old_price_pattern = r'<span class="[^"]*?\s*tsBodyControl[^"]*?"[^>]*?>\s*([0-9\s]+)\s*₽\s*</span>'
-        old_price_match = re.search(old_price_pattern, html_content)
-        
-        # Регулярное выражение для поиска цены с картой
-        card_price_pattern = r'с Ozon Картой[^<]*?<span[^>]*?>\s*([0-9\s]+)\s*₽\s*</span>'
-        card_price_match = re.search(card_price_pattern, html_content, re.DOTALL)
-        
-        price = extract_price_from_string(price_match.group(1)) if price_match else None
-        original_price = extract_price_from_string(old_price_match.group(1)) if old_price_match else price
-        card_price = extract_price_from_string(card_price_match.group(1)) if card_price_match else price
-        
+        price = None
+        original_price = None
+        card_price = None
+
+        for match in _PRICE_SPAN_RE.finditer(html_content):
+            value = match.group('value')
+            css_class = match.group('css_class')
+
+            if css_class is not None:
+                if price is None and 'tsBody' in css_class:
+                    price = value
+                if original_price is None and 'tsBodyControl' in css_class:
+                    original_price = value
+
+            # Цена с картой - первый тег после метки "с Ozon Картой"
+            if card_price is None:
+                text_start = html_content.rfind('<', 0, match.start()) + 1
+                if html_content.find(CARD_PRICE_LABEL, text_start, match.start()) != -1:
+                    card_price = value
+
+            if price is not None and original_price is not None and card_price is not None:
+                break
+
+        price = extract_price_from_string(price) if price else None
+        original_price = extract_price_from_string(original_price) if original_price else price
+        card_price = extract_price_from_string(card_price) if card_price else price
+
         if price:
             return PriceInfo(
                 cardPrice=card_price,
@@ -152,4 +201,43 @@ def extract_price_from_html(html_content: str) -> Optional[PriceInfo]:
         return None
     except Exception as e:
         logger.error(f"Error extracting price from HTML: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def extract_json_from_html(html_content: str) -> Optional[str]:
+    """
+    Extract JSON from HTML wrapper (from <pre> tag)
+    """
+    try:
+        # Ищем содержимое между <pre> тегами
+        pre_open = _PRE_OPEN_RE.search(html_content)
+        pre_close = _PRE_CLOSE_RE.search(html_content, pre_open.end()) if pre_open else None
+        
+        if pre_close:
+            json_content = html_content[pre_open.end():pre_close.start()].strip()
+            logger.debug("Found JSON in <pre> tag")
+            return json_content
+        
+        # Если не нашли в <pre>, попробуем найти JSON напрямую
+        # Ищем первую открывающую скобку до последней закрывающей
+        first_brace = html_content.find('{')
+        last_brace = html_content.rfind('}')
+        
+        if first_brace != -1 and last_brace != -1 and first_brace < last_brace:
+            json_content = html_content[first_brace:last_brace + 1]
+            logger.debug("Found JSON by brace search")
+            return json_content
+        
+        logger.debug("No JSON found in HTML content")
+        return None
+        
+    except Exception as e:
+        logger.error(f"Error extracting JSON from HTML: {e}")
+        return None
+
+
+def content_hash(content: str) -> str:
+    """
+    Short stable hash of a widget or other source content
+    """
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
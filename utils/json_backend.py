@@ -0,0 +1,31 @@
+import json
+import logging
+from typing import Any, Union
+
+
+logger = logging.getLogger(__name__)
+
+# Быстрый JSON-парсер, если установлен (pip install orjson)
+try:
+    import orjson
+
+    JSON_BACKEND = "orjson"
+
+    def loads(content: Union[str, bytes]) -> Any:
+        """
+        Decode JSON with orjson
+        """
+        return orjson.loads(content)
+
+except ImportError:
+    JSON_BACKEND = "json"
+
+    def loads(content: Union[str, bytes]) -> Any:
+        """
+        Decode JSON with the standard library
+        """
+        return json.loads(content)
+
+
+# orjson.JSONDecodeError наследуется от json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
@@ -0,0 +1,129 @@
+from typing import Callable, Iterator
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client.core import REGISTRY, CounterMetricFamily, GaugeMetricFamily
+from utils.rate_limiter import get_pacer
+
+
+# От миллисекунд (разбор JSON) до минут (запуск Chrome, загрузка страницы)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "ozon_parser_stage_seconds",
+    "Time spent in a hot-path stage of article parsing",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+RETRIES = Counter(
+    "ozon_parser_retries_total",
+    "Article parse attempts that were retried",
+    ["reason"]
+)
+BLOCKS = Counter(
+    "ozon_parser_blocks_total",
+    "Responses recognized as anti-bot challenge pages",
+    ["source"]
+)
+ARTICLES = Counter(
+    "ozon_parser_articles_total",
+    "Articles returned to clients",
+    ["outcome"]
+)
+HTTP_FALLBACKS = Counter(
+    "ozon_parser_http_fallbacks_total",
+    "Articles that fell back from direct HTTP to the browser"
+)
+MEMORY_RECYCLES = Counter(
+    "ozon_driver_memory_recycles_total",
+    "Drivers recycled for exceeding the memory budget"
+)
+REAPED_PROCESSES = Counter(
+    "ozon_driver_reaped_processes_total",
+    "Leftover chrome / chromedriver processes killed"
+)
+
+
+def stage_timer(stage: str):
+    """
+    Context manager / decorator that observes the duration of a stage
+    """
+    return STAGE_SECONDS.labels(stage).time()
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+class ParserCollector:
+    """
+    Pool, scheduler, cache and pacing state of the current parser,
+    read at scrape time from the components' stats()
+    """
+
+    def __init__(self, get_parser: Callable[[], object]):
+        self.get_parser = get_parser
+
+    def collect(self) -> Iterator:
+        parser = self.get_parser()
+        if parser is None:
+            return
+
+        # Внешние воркеры: у API есть только очередь
+        if not hasattr(parser, "pool"):
+            queue = parser.stats()
+            articles = GaugeMetricFamily("ozon_job_queue_articles", "Queued job articles by state", labels=["state"])
+            for state in ("pending", "in_flight", "done", "failed"):
+                articles.add_metric([state], queue[state])
+            yield articles
+            yield self._gauge("ozon_job_queue_unfinished_jobs", "Queue jobs with articles left", queue["unfinished_jobs"])
+            yield self._gauge("ozon_job_queue_unfinished_requests", "API requests waiting for workers", queue["unfinished_requests"])
+            return
+
+        pool = parser.pool.stats()
+        yield self._gauge("ozon_driver_pool_size", "Drivers launched by the pool", pool["size"])
+        yield self._gauge("ozon_driver_pool_idle", "Idle drivers in the pool", pool["idle"])
+        yield self._gauge("ozon_driver_pool_in_use", "Drivers checked out of the pool", pool["in_use"])
+        yield self._gauge("ozon_driver_pool_max_size", "Maximum number of drivers", pool["max_size"])
+        yield self._counter("ozon_driver_pool_created", "Drivers launched since start", pool["created_total"])
+        yield self._counter("ozon_driver_pool_recycled", "Drivers recycled since start", pool["recycled_total"])
+        memory = GaugeMetricFamily("ozon_driver_memory_bytes", "RSS of a driver's chromedriver + Chrome process tree", labels=["pid"])
+        for driver in pool["drivers"]:
+            if driver["pid"]:
+                memory.add_metric([str(driver["pid"])], driver["rss_mb"] * 1024 * 1024)
+        yield memory
+
+        scheduler = parser.scheduler.stats()
+        yield self._gauge("ozon_scheduler_workers", "Scheduler worker threads", scheduler["workers"])
+        yield self._gauge("ozon_scheduler_busy_workers", "Scheduler workers running a task", scheduler["busy_workers"])
+        yield self._gauge("ozon_scheduler_active_batches", "Batches with queued tasks", scheduler["active_batches"])
+        yield self._gauge("ozon_scheduler_queued_tasks", "Articles waiting for a worker", scheduler["queued_tasks"])
+
+        if parser.cache:
+            cache = parser.cache.stats()
+            yield self._gauge("ozon_cache_size", "Results held in the cache", cache["size"])
+            yield self._counter("ozon_cache_hits", "Cache hits since start", cache["hits"])
+            yield self._counter("ozon_cache_misses", "Cache misses since start", cache["misses"])
+
+        hosts = get_pacer().stats().get("hosts", {})
+        rate = GaugeMetricFamily("ozon_pacing_rate", "Current request rate allowed per host", labels=["host"])
+        for host, limiter in hosts.items():
+            rate.add_metric([host], limiter["rate"])
+        yield rate
+
+    @staticmethod
+    def _gauge(name: str, documentation: str, value: float) -> GaugeMetricFamily:
+        return GaugeMetricFamily(name, documentation, value=value)
+
+    @staticmethod
+    def _counter(name: str, documentation: str, value: float) -> CounterMetricFamily:
+        return CounterMetricFamily(name, documentation, value=value)
+
+
+def register_parser_collector(get_parser: Callable[[], object]):
+    REGISTRY.register(ParserCollector(get_parser))
+
+
+def render_metrics() -> tuple:
+    """
+    Metrics in Prometheus text format as (body, content type)
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
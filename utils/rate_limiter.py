@@ -0,0 +1,179 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from config.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket whose refill rate follows AIMD: additive increase while
+    requests succeed, multiplicative decrease when anti-bot protection fires
+    """
+
+    def __init__(
+        self,
+        initial_rate: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        decrease_factor: Optional[float] = None,
+        burst: Optional[float] = None
+    ):
+        self.rate = settings.RATE_INITIAL if initial_rate is None else initial_rate
+        self.min_rate = settings.RATE_MIN if min_rate is None else min_rate
+        self.max_rate = settings.RATE_MAX if max_rate is None else max_rate
+        self.increase = settings.RATE_INCREASE if increase is None else increase
+        self.decrease_factor = settings.RATE_DECREASE_FACTOR if decrease_factor is None else decrease_factor
+        self.burst = settings.RATE_BURST if burst is None else burst
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.successes = 0
+        self.blocks = 0
+
+    def acquire(self):
+        """
+        Block until the caller may send the next request
+        """
+        with self._lock:
+            self._refill()
+            # Резервируем токен заранее: следующие вызовы встанут в очередь за нами
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_block(self):
+        with self._lock:
+            self._refill()
+            self.blocks += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # Сжигаем накопленный запас, чтобы пауза наступила сразу
+            self._tokens = min(self._tokens, 0.0)
+            rate = self.rate
+        logger.warning(f"Anti-bot protection detected, request rate lowered to {rate:.2f}/s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "tokens": round(self._tokens, 3),
+                "successes": self.successes,
+                "blocks": self.blocks
+            }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class ConservativePacer:
+    """
+    Fixed human-like random pauses (the original pacing)
+    """
+
+    simulate_scroll = True
+
+    def wait_before_request(self, url: str):
+        delay = random.uniform(3.0, 8.0)
+        logger.info(f"Adding random delay of {delay:.2f} seconds before request")
+        time.sleep(delay)
+
+    def dwell(self):
+        time.sleep(random.uniform(2.0, 5.0))
+
+    def scroll_pause(self):
+        time.sleep(random.uniform(0.3, 0.7))
+
+    def settle_pause(self):
+        time.sleep(random.uniform(0.5, 1.0))
+
+    def record_success(self, url: str):
+        pass
+
+    def record_block(self, url: str):
+        pass
+
+    def stats(self) -> dict:
+        return {"mode": "conservative"}
+
+
+class AdaptivePacer:
+    """
+    Pacing driven by one adaptive rate limiter per host, shared by all workers
+    """
+
+    simulate_scroll = False
+
+    def __init__(self):
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter_for(self, url: str) -> AdaptiveRateLimiter:
+        host = urlsplit(url).netloc
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = AdaptiveRateLimiter()
+                self._limiters[host] = limiter
+            return limiter
+
+    def wait_before_request(self, url: str):
+        self.limiter_for(url).acquire()
+
+    def dwell(self):
+        time.sleep(settings.PACING_SETTLE_DELAY)
+
+    def scroll_pause(self):
+        pass
+
+    def settle_pause(self):
+        pass
+
+    def record_success(self, url: str):
+        self.limiter_for(url).record_success()
+
+    def record_block(self, url: str):
+        self.limiter_for(url).record_block()
+
+    def stats(self) -> dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {
+            "mode": "adaptive",
+            "hosts": {host: limiter.stats() for host, limiter in limiters.items()}
+        }
+
+
+_pacer = None
+_pacer_lock = threading.Lock()
+
+
+def get_pacer():
+    """
+    Global pacer selected by PACING_MODE ("adaptive" or "conservative")
+    """
+    global _pacer
+    with _pacer_lock:
+        if _pacer is None:
+            if settings.PACING_MODE == "conservative":
+                _pacer = ConservativePacer()
+            else:
+                _pacer = AdaptivePacer()
+            logger.info(f"Using {settings.PACING_MODE} request pacing")
+        return _pacer
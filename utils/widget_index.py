@@ -0,0 +1,82 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+from utils.json_backend import loads, JSONDecodeError
+
+
+logger = logging.getLogger(__name__)
+
+
+class WidgetIndex:
+    """
+    Index over widgetStates built in a single pass.
+
+    Keys are bucketed by prefix ("webPrice-3121879-default-1" -> "webPrice"),
+    widget values are decoded lazily and at most once.
+    """
+
+    def __init__(self, widget_states: Dict[str, Any]):
+        self.widget_states = widget_states
+        self._buckets: Dict[str, List[str]] = {}
+        self._decoded: Dict[tuple, Any] = {}
+
+        for key in widget_states:
+            prefix = key.split('-', 1)[0]
+            self._buckets.setdefault(prefix, []).append(key)
+
+    @classmethod
+    def from_json(cls, json_content: str) -> Optional["WidgetIndex"]:
+        """
+        Decode a composer-api response once and index its widgetStates.
+        Raises JSONDecodeError for invalid JSON, returns None without widgetStates
+        """
+        data = loads(json_content)
+        widget_states = data.get('widgetStates') if isinstance(data, dict) else None
+        if not widget_states:
+            return None
+        return cls(widget_states)
+
+    def __len__(self) -> int:
+        return len(self.widget_states)
+
+    def keys(self, prefix: str) -> List[str]:
+        return self._buckets.get(prefix, [])
+
+    def raw(self, prefix: str) -> Optional[str]:
+        """
+        First raw string value of a widget with the given prefix
+        """
+        for key in self.keys(prefix):
+            value = self.widget_states[key]
+            if isinstance(value, str):
+                return value
+        return None
+
+    def iter_decoded(self, prefix: str, unescape_quotes: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Decoded widget values with the given prefix, skipping invalid ones
+        """
+        for key in self.keys(prefix):
+            cache_key = (key, unescape_quotes)
+            if cache_key not in self._decoded:
+                self._decoded[cache_key] = self._decode(self.widget_states[key], unescape_quotes)
+            decoded = self._decoded[cache_key]
+            if decoded is not None:
+                yield decoded
+
+    def decoded(self, prefix: str, unescape_quotes: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        First decodable widget value with the given prefix
+        """
+        return next(self.iter_decoded(prefix, unescape_quotes), None)
+
+    @staticmethod
+    def _decode(value: Any, unescape_quotes: bool) -> Optional[Dict[str, Any]]:
+        if not isinstance(value, str):
+            return None
+        if unescape_quotes:
+            value = value.replace('&quot;', '"')
+        try:
+            decoded = loads(value)
+        except JSONDecodeError:
+            return None
+        return decoded if isinstance(decoded, dict) else None
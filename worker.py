@@ -0,0 +1,119 @@
+"""
+Scrape worker processes for WORKER_MODE=external.
+
+Each process runs its own OzonParser (own Chrome pool) and consumes the job
+queue at JOB_QUEUE_PATH; the API only enqueues articles and reads results
+back. A supervisor restarts processes that die; articles they held go back
+to the queue when their lease expires.
+
+    JOB_QUEUE_PATH=/data/jobs.sqlite python worker.py --processes 4
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from config.settings import settings
+
+
+logger = logging.getLogger("worker")
+
+# Не перезапускать процесс, падающий сразу после старта, чаще этого
+RESTART_DELAY = 5
+
+
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def run_worker():
+    """
+    One worker process: dispatch queued articles to a local parser until stopped
+    """
+    from parser.jobs import PersistentJobManager
+    from parser.ozon_parser import OzonParser
+
+    configure_logging()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    parser = None
+    parser_lock = threading.Lock()
+
+    def get_parser():
+        # Chrome запускается только когда в очереди появилась работа
+        nonlocal parser
+        with parser_lock:
+            if parser is None:
+                parser = OzonParser(external_worker=True)
+                parser.initialize()
+        return parser
+
+    # Берем из очереди не больше, чем можем парсить сразу: остальное достанется соседним процессам
+    manager = PersistentJobManager(get_parser, window=min(settings.MAX_WORKERS, settings.DRIVER_POOL_MAX_SIZE))
+    manager.start()
+    stop_event.wait()
+
+    logger.info("Stopping worker, returning unfinished articles to the queue")
+    manager.cancel_all()
+    with parser_lock:
+        if parser:
+            parser.close()
+    manager.queue.close()
+
+
+def supervise(processes: int):
+    """
+    Keep the given number of worker processes running
+    """
+    context = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    def spawn(index: int):
+        process = context.Process(target=run_worker, name=f"worker-{index}")
+        process.start()
+        logger.info(f"Started {process.name} (pid {process.pid})")
+        return process, time.monotonic()
+
+    children = {index: spawn(index) for index in range(processes)}
+
+    while not stopping.wait(1):
+        for index, (process, started_at) in list(children.items()):
+            if process.is_alive():
+                continue
+            logger.warning(f"{process.name} exited with code {process.exitcode}, restarting")
+            # Процесс, упавший сразу после старта, перезапускаем с паузой
+            if time.monotonic() - started_at < RESTART_DELAY and stopping.wait(RESTART_DELAY):
+                break
+            children[index] = spawn(index)
+
+    logger.info("Stopping worker processes...")
+    for process, _ in children.values():
+        if process.is_alive():
+            process.terminate()
+    for process, _ in children.values():
+        process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ozon scrape workers consuming the job queue")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes on this node")
+    args = parser.parse_args()
+
+    configure_logging()
+    if not settings.JOB_QUEUE_PATH:
+        parser.error("JOB_QUEUE_PATH must point to the queue shared with the API")
+
+    logger.info(f"Starting {args.processes} worker processes on {settings.JOB_QUEUE_PATH}")
+    supervise(args.processes)
+
+
+if __name__ == "__main__":
+    main()